@@ -3,14 +3,37 @@ ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Auction event streams are served directly by ``shop.streams`` so that idle
+subscribers never occupy one of Django's sync worker threads; every other
+request is handed to Django. The streams only exist under ASGI, which is why
+the web process runs uvicorn (see heroku.yml and docker-compose.yml) instead
+of a WSGI server or runserver.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+if settings.DEBUG:
+    # Serve static files during development, as runserver did
+    django_application = ASGIStaticFilesHandler(django_application)
+
+from shop.streams import AUCTION_STREAM_PATH, auction_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http":
+        match = AUCTION_STREAM_PATH.match(scope["path"])
+        if match:
+            auction_id = int(match["auction_id"])
+            await auction_stream(scope, receive, send, auction_id)
+            return
+    await django_application(scope, receive, send)
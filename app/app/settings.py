@@ -63,7 +63,7 @@ INSTALLED_APPS = [
     "corsheaders",
     "core",
     "user",
-    "shop",
+    "shop.apps.ShopConfig",
 ]
 
 MIDDLEWARE = [
@@ -123,6 +123,10 @@ DATABASES = {
     }
 }
 
+# Shared cache, point CACHE_URL at memcached or redis when running several
+# workers so dashboard invalidations reach all of them.
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -194,3 +198,65 @@ STATIC_URL = '/static/static/'
 MEDIA_URL = '/upload/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'upload')
+
+
+# Bidding
+# "database" decides every bid with a conditional update (default),
+# "memory" keeps live auctions in process and writes bids in batches.
+# The memory engine must only run in a single bidding worker.
+BID_ENGINE = env("BID_ENGINE", default="database")
+BID_ENGINE_FLUSH_INTERVAL = env.float("BID_ENGINE_FLUSH_INTERVAL", default=1.0)
+BID_ENGINE_FLUSH_SIZE = env.int("BID_ENGINE_FLUSH_SIZE", default=500)
+BID_ENGINE_RECENT_BIDS = env.int("BID_ENGINE_RECENT_BIDS", default=50)
+# A batch of bids failing to flush RETRIES times in a row is written bid
+# by bid, the bids still failing are logged and dropped. close_auctions
+# waits INTERVAL * (RETRIES + 1) seconds past a deadline with this engine.
+BID_ENGINE_FLUSH_RETRIES = env.int("BID_ENGINE_FLUSH_RETRIES", default=3)
+
+# Soft close: a bid placed within the last WINDOW seconds of an auction
+# moves its end_time to EXTENSION seconds after the bid. 0 disables it.
+AUCTION_SOFT_CLOSE_WINDOW = env.int("AUCTION_SOFT_CLOSE_WINDOW", default=0)
+AUCTION_SOFT_CLOSE_EXTENSION = env.int("AUCTION_SOFT_CLOSE_EXTENSION", default=120)
+
+# Responses to bids sent with an Idempotency-Key header are replayed to
+# retries for TTL seconds, keeping at most CACHE_SIZE of them per process.
+BID_IDEMPOTENCY_CACHE_SIZE = env.int("BID_IDEMPOTENCY_CACHE_SIZE", default=10000)
+BID_IDEMPOTENCY_TTL = env.int("BID_IDEMPOTENCY_TTL", default=600)
+
+# Auction views are buffered per process and written in batches. A user
+# viewing the same auction again within WINDOW seconds is coalesced, at
+# most MAX_PENDING views wait for the next flush. A batch failing to flush
+# RETRIES times in a row is written view by view, dropping the failures.
+VIEW_BUFFER_WINDOW = env.int("VIEW_BUFFER_WINDOW", default=600)
+VIEW_BUFFER_FLUSH_INTERVAL = env.float("VIEW_BUFFER_FLUSH_INTERVAL", default=2.0)
+VIEW_BUFFER_FLUSH_SIZE = env.int("VIEW_BUFFER_FLUSH_SIZE", default=1000)
+VIEW_BUFFER_MAX_PENDING = env.int("VIEW_BUFFER_MAX_PENDING", default=100000)
+VIEW_BUFFER_FLUSH_RETRIES = env.int("VIEW_BUFFER_FLUSH_RETRIES", default=3)
+
+# Relative standard error of the unique viewer sketches kept per auction
+# and day. Halving it quadruples their size, at most 64 KB at 0.004.
+# Rebuild the rollups after changing it to apply it to past days.
+VIEWER_SKETCH_ERROR = env.float("VIEWER_SKETCH_ERROR", default=0.02)
+
+# Seller dashboards, charts and totals are cached until the seller's next
+# bid or view, or for at most CACHE_TTL seconds. Dashboards and charts
+# cover at most MAX_DAYS days per request.
+ANALYTICS_CACHE_TTL = env.int("ANALYTICS_CACHE_TTL", default=300)
+ANALYTICS_SELLER_MEMO_SIZE = env.int("ANALYTICS_SELLER_MEMO_SIZE", default=100000)
+DASHBOARD_MAX_DAYS = env.int("DASHBOARD_MAX_DAYS", default=366)
+
+# Product search filters and facet counts are answered from an in-process
+# bitmap index of the searchable products, built by each worker on its
+# first search and kept current by model signals. After changes made
+# without signals, like bulk_create() or raw SQL, run rebuild_search_index:
+# every worker sharing the CACHES backend rebuilds its index on its next
+# search.
+PRODUCT_INDEX = env.bool("PRODUCT_INDEX", default=False)
+
+# Backend of the product search keywords filter: "fts5" (SQLite full-text
+# index), "postgres" (text search vectors), "basic" (unranked substring
+# matching) or "auto" to pick from the database engine.
+PRODUCT_SEARCH_BACKEND = env("PRODUCT_SEARCH_BACKEND", default="auto")
+
+# Seconds between keep-alive comments on idle auction event streams
+AUCTION_STREAM_HEARTBEAT = env.int("AUCTION_STREAM_HEARTBEAT", default=30)
@@ -0,0 +1,49 @@
+import threading
+from collections import Counter
+
+
+class Metrics:
+    """
+    Process-local counters and timings, read through the admin metrics
+    endpoint. Counters named <prefix>.hits and <prefix>.misses are also
+    reported as <prefix>.hit_ratio.
+    """
+
+    def __init__(self):
+        self._counters = Counter()
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def observe(self, name, seconds):
+        """Record a duration, reported as its count, average and maximum"""
+        with self._lock:
+            count, total, longest = self._timings.get(name, (0, 0.0, 0.0))
+            self._timings[name] = (
+                count + 1,
+                total + seconds,
+                max(longest, seconds),
+            )
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = dict(self._counters)
+            timings = dict(self._timings)
+        for name, hits in list(snapshot.items()):
+            if name.endswith(".hits"):
+                prefix = name[: -len(".hits")]
+                lookups = hits + snapshot.get(f"{prefix}.misses", 0)
+                snapshot[f"{prefix}.hit_ratio"] = (
+                    round(hits / lookups, 4) if lookups else None
+                )
+        for name, (count, total, longest) in timings.items():
+            snapshot[f"{name}.count"] = count
+            snapshot[f"{name}.avg_ms"] = round(total / count * 1000, 3)
+            snapshot[f"{name}.max_ms"] = round(longest * 1000, 3)
+        return snapshot
+
+
+metrics = Metrics()
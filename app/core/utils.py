@@ -1,12 +1,19 @@
+import base64
 import http.client
 import json
 import os
+from functools import reduce
 
 import requests
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
 from django.utils.text import slugify
+from rest_framework.exceptions import NotFound
 from rest_framework.exceptions import ValidationError as DRFValidationError
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import exception_handler as drf_exception_handler
 
 app_name = "Auction-App"
@@ -119,3 +126,107 @@ class StandardAdminResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 1000
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination seeking on the ordering columns instead of an offset.
+
+    The cursor holds the ordering values of the last row of the page, and the
+    next page is selected with a lexicographic comparison on them, so any page
+    costs one index range scan. The last ordering field must be unique.
+    """
+
+    ordering = ("-id",)
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, queryset, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            fields = [
+                queryset.model._meta.get_field(name.lstrip("-"))
+                for name in self.ordering
+            ]
+            return [
+                field.to_python(value)
+                for field, value in zip(fields, values)
+            ]
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row):
+        values = [getattr(row, name.lstrip("-")) for name in self.ordering]
+        # Keep full precision, DjangoJSONEncoder truncates to milliseconds
+        payload = json.dumps(
+            [
+                value.isoformat() if hasattr(value, "isoformat") else value
+                for value in values
+            ],
+            cls=DjangoJSONEncoder,
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def seek_filter(self, values):
+        """(a, b) > (x, y) written as a > x OR (a = x AND b > y)"""
+        clauses = []
+        for position, name in enumerate(self.ordering):
+            field = name.lstrip("-")
+            lookup = "lt" if name.startswith("-") else "gt"
+            equal = {
+                prefix.lstrip("-"): values[index]
+                for index, prefix in enumerate(self.ordering[:position])
+            }
+            after = {f"{field}__{lookup}": values[position]}
+            clauses.append(Q(**equal, **after))
+        return reduce(lambda left, right: left | right, clauses)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        values = self.decode_cursor(queryset, request)
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(values))
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        self.next_cursor = None
+        if self.has_next:
+            self.next_cursor = self.encode_cursor(rows[-1])
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.next_cursor
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
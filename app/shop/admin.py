@@ -8,7 +8,10 @@ admin.site.register(models.Category)
 admin.site.register(models.Media)
 admin.site.register(models.Product)
 admin.site.register(models.Bid)
+admin.site.register(models.ProxyBid)
 admin.site.register(models.UserStats)
+admin.site.register(models.AuctionDailyStats)
+admin.site.register(models.AuctionBidStats)
 admin.site.register(models.ProductAttribute)
 admin.site.register(models.ProductAttributeValue)
 admin.site.register(models.ProductAttributeValues)
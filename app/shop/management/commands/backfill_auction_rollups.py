@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from shop.services.auction_rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    """Django command rebuilding daily auction rollups from bids and views"""
+
+    help = "Rebuild AuctionDailyStats from the Bid and UserStats tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="Only rebuild days from this date (YYYY-MM-DD) on",
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups(options["since"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} daily rollups"))
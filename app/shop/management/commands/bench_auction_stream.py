@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from shop.services.auction_events import BID_EVENT, auction_events
+from shop.streams import stream_events
+
+
+class Command(BaseCommand):
+    """Django command measuring idle auction stream subscribers per worker"""
+
+    help = (
+        "Hold many idle auction event streams and measure memory and fan-out"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, default=5000)
+        parser.add_argument("--events", type=int, default=10)
+        parser.add_argument("--auction", type=int, default=1)
+
+    def handle(self, *args, **options):
+        asyncio.run(
+            self.run(
+                options["subscribers"], options["events"], options["auction"]
+            )
+        )
+
+    async def run(self, subscribers, events, auction_id):
+        disconnected = asyncio.Event()
+        delivered = 0
+        finished = 0
+        all_delivered = asyncio.Event()
+        last_event = b'"amount":%d}' % (events - 1)
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal delivered, finished
+            body = message.get("body")
+            if body and not body.startswith(b":"):
+                delivered += 1
+                # Slow clients may skip events, but every client gets the last
+                if last_event in body:
+                    finished += 1
+                    if finished == subscribers:
+                        all_delivered.set()
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+        clients = [
+            asyncio.ensure_future(
+                stream_events(auction_id, None, receive, send)
+            )
+            for _ in range(subscribers)
+        ]
+        while auction_events.subscriber_count(auction_id) < subscribers:
+            await asyncio.sleep(0.01)
+        idle = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        def publish():
+            for amount in range(events):
+                auction_events.publish(
+                    auction_id, BID_EVENT, {"amount": amount}
+                )
+
+        started = time.perf_counter()
+        threading.Thread(target=publish).start()
+        if events and subscribers:
+            await all_delivered.wait()
+        fan_out = time.perf_counter() - started
+
+        disconnected.set()
+        await asyncio.gather(*clients)
+
+        self.stdout.write(f"Idle subscribers: {subscribers}")
+        self.stdout.write(
+            f"Memory held: {idle / 1024:.0f} KiB "
+            f"({idle / subscribers:.0f} B per subscriber)"
+        )
+        self.stdout.write(
+            f"Fan-out of {events} events: {fan_out * 1000:.1f} ms "
+            f"({delivered} messages)"
+        )
+        self.stdout.write(
+            "Subscribers left after disconnect: "
+            f"{auction_events.subscriber_count()}"
+        )
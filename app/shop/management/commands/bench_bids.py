@@ -0,0 +1,379 @@
+import json
+import multiprocessing
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import User
+from shop.models import Product
+from shop.services import AUCTION_NOT_OPEN, BID_TOO_LOW, get_bid_engine
+
+CENT = Decimal("0.01")
+
+ACCEPTED = "accepted"
+REJECTED = "rejected"
+# Rejections expected from concurrent bidders, any other failure is an error
+RULE_REJECTIONS = {AUCTION_NOT_OPEN, BID_TOO_LOW}
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(int(round(fraction * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def next_amount(started):
+    """Rising bid amount, so concurrent bidders keep outbidding each other"""
+    amount = (time.time() - started) * 1000 + random.uniform(1, 50)
+    return Decimal(amount).quantize(CENT)
+
+
+def bid_outcome(status_code, data):
+    """ACCEPTED, REJECTED by the bidding rules, or a description of an error"""
+    if status_code == 201:
+        return ACCEPTED
+    detail = data.get("detail") if isinstance(data, dict) else None
+    if status_code == 400 and detail in RULE_REJECTIONS:
+        return REJECTED
+    return f"{status_code} {detail}" if detail else str(status_code)
+
+
+def allowed_host():
+    """A host name settings.ALLOWED_HOSTS accepts, for the test client"""
+    hosts = [host for host in settings.ALLOWED_HOSTS if host]
+    if not hosts or "*" in hosts:
+        # Also what DEBUG allows when ALLOWED_HOSTS is empty
+        return "localhost"
+    return hosts[0].lstrip(".")
+
+
+class TestClientBidder:
+    """Places bids through the Django test client inside this process"""
+
+    def __init__(self, user_id):
+        self.client = APIClient(SERVER_NAME=allowed_host())
+        self.client.force_authenticate(User.objects.get(pk=user_id))
+        self.path = reverse("shop:bid-create")
+
+    def bid(self, auction_id, amount):
+        response = self.client.post(
+            self.path,
+            {"auction": auction_id, "bid_amount": str(amount)},
+            format="json",
+        )
+        return response.status_code, getattr(response, "data", None)
+
+
+class HttpBidder:
+    """Places bids against a running server with the user's API token"""
+
+    def __init__(self, url, token):
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Token {token}"
+        self.url = url.rstrip("/") + reverse("shop:bid-create")
+
+    def bid(self, auction_id, amount):
+        response = self.session.post(
+            self.url, json={"auction": auction_id, "bid_amount": str(amount)}
+        )
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        return response.status_code, data
+
+
+def run_bidder(task):
+    """Place a bidder's bids, returning (latency, outcome, auction, amount)"""
+    user_id, token, auction_ids, bids, url, started = task
+    if url:
+        bidder = HttpBidder(url, token)
+    else:
+        bidder = TestClientBidder(user_id)
+
+    results = []
+    for _ in range(bids):
+        auction_id = random.choice(auction_ids)
+        amount = next_amount(started)
+        sent = time.perf_counter()
+        try:
+            outcome = bid_outcome(*bidder.bid(auction_id, amount))
+        except Exception as e:
+            outcome = f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - sent
+        results.append((latency, outcome, auction_id, amount))
+    close_old_connections()
+    return results
+
+
+def run_bidders_in_threads(tasks):
+    results = [None] * len(tasks)
+
+    def work(index, task):
+        results[index] = run_bidder(task)
+
+    threads = [
+        threading.Thread(target=work, args=(index, task))
+        for index, task in enumerate(tasks)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def setup_worker():
+    # Needed when processes are spawned instead of forked
+    django.setup()
+
+
+def run_bidders_in_processes(tasks):
+    connections.close_all()
+    with multiprocessing.Pool(len(tasks), initializer=setup_worker) as pool:
+        return pool.map(run_bidder, tasks)
+
+
+class Command(BaseCommand):
+    """Django command measuring the bid path under concurrent bidders"""
+
+    help = (
+        "Seed auctions and bidders, fire concurrent bids and report latency "
+        "and lost updates"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--auctions", type=int, default=1)
+        parser.add_argument("--bidders", type=int, default=50)
+        parser.add_argument(
+            "--bids", type=int, default=20, help="Bids per bidder"
+        )
+        parser.add_argument(
+            "--workers", choices=("threads", "processes"), default="threads"
+        )
+        parser.add_argument(
+            "--url",
+            help="Bid against a running server instead of the test client",
+        )
+        parser.add_argument(
+            "--json",
+            dest="json_path",
+            help="Write the report as JSON, '-' for stdout",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the seeded users and auctions",
+        )
+
+    def handle(self, *args, **options):
+        if (
+            options["workers"] == "processes"
+            and not options["url"]
+            and settings.BID_ENGINE == "memory"
+        ):
+            raise CommandError(
+                "The memory bid engine keeps state per process, "
+                "use threads or --url with processes."
+            )
+
+        run = uuid.uuid4().hex[:8]
+        bidders, auction_ids = self.seed(
+            run, options["bidders"], options["auctions"]
+        )
+        tokens = {}
+        if options["url"]:
+            tokens = {
+                bidder.id: Token.objects.create(user=bidder).key
+                for bidder in bidders
+            }
+
+        started = time.time()
+        tasks = [
+            (
+                bidder.id,
+                tokens.get(bidder.id),
+                auction_ids,
+                options["bids"],
+                options["url"],
+                started,
+            )
+            for bidder in bidders
+        ]
+        wall_started = time.perf_counter()
+        if options["workers"] == "processes":
+            results = run_bidders_in_processes(tasks)
+        else:
+            results = run_bidders_in_threads(tasks)
+        elapsed = time.perf_counter() - wall_started
+
+        if not options["url"]:
+            get_bid_engine().flush()
+        report = self.build_report(options, auction_ids, results, elapsed)
+
+        if not options["keep"]:
+            Product.objects.filter(id__in=auction_ids).delete()
+            User.objects.filter(email__startswith=f"bench-{run}-").delete()
+
+        if options["json_path"] == "-":
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            if options["json_path"]:
+                with open(options["json_path"], "w") as report_file:
+                    json.dump(report, report_file, indent=2)
+            self.write_summary(report)
+
+        if report["errors"]:
+            raise CommandError(
+                f"{report['errors']} bids failed for other reasons than the "
+                "bidding rules."
+            )
+
+    def seed(self, run, bidder_count, auction_count):
+        User.objects.bulk_create(
+            User(email=f"bench-{run}-{i}@example.com", name=f"bench {i}")
+            for i in range(bidder_count + 1)
+        )
+        users = list(
+            User.objects.filter(email__startswith=f"bench-{run}-")
+            .order_by("id")
+        )
+        seller, bidders = users[0], users[1:]
+
+        now = timezone.now()
+        Product.objects.bulk_create(
+            Product(
+                slug=f"bench-{run}-{i}",
+                name=f"Benchmark auction {i}",
+                description="Benchmark auction",
+                user=seller,
+                region="bench",
+                city="bench",
+                start_time=now - timedelta(minutes=1),
+                end_time=now + timedelta(days=1),
+                bidding_step=Decimal("1"),
+            )
+            for i in range(auction_count)
+        )
+        auction_ids = list(
+            Product.objects.filter(slug__startswith=f"bench-{run}-")
+            .values_list("id", flat=True)
+        )
+        return bidders, auction_ids
+
+    def build_report(self, options, auction_ids, results, elapsed):
+        rows = [row for bidder_rows in results for row in bidder_rows]
+        latencies = sorted(row[0] for row in rows)
+        outcomes = Counter(row[1] for row in rows)
+        accepted = outcomes.pop(ACCEPTED, 0)
+        rejected = outcomes.pop(REJECTED, 0)
+
+        accepted_highest = {}
+        for _, outcome, auction_id, amount in rows:
+            if outcome != ACCEPTED:
+                continue
+            if amount > accepted_highest.get(auction_id, 0):
+                accepted_highest[auction_id] = amount
+
+        stored = {
+            auction["id"]: auction
+            for auction in Product.objects.filter(id__in=auction_ids)
+            .annotate(
+                stored_bids=Count("bids"),
+                stored_highest=Max("bids__bid_amount"),
+            )
+            .values(
+                "id", "current_highest_bid", "stored_bids", "stored_highest"
+            )
+        }
+        lost_updates = [
+            auction_id
+            for auction_id, amount in accepted_highest.items()
+            if stored[auction_id]["current_highest_bid"] != amount
+            or stored[auction_id]["stored_highest"] != amount
+        ]
+        stored_bids = sum(
+            auction["stored_bids"] for auction in stored.values()
+        )
+
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 3)
+
+        return {
+            "config": {
+                "auctions": options["auctions"],
+                "bidders": options["bidders"],
+                "bids_per_bidder": options["bids"],
+                "workers": options["workers"],
+                "target": options["url"] or "test-client",
+                "bid_engine": settings.BID_ENGINE,
+                "database": connections["default"].vendor,
+            },
+            "requests": len(rows),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": (
+                round(len(rows) / elapsed, 1) if elapsed else None
+            ),
+            "latency_ms": {
+                "p50": ms(percentile(latencies, 0.50)),
+                "p95": ms(percentile(latencies, 0.95)),
+                "p99": ms(percentile(latencies, 0.99)),
+                "max": ms(latencies[-1] if latencies else None),
+            },
+            "accepted": accepted,
+            "rejected": rejected,
+            "errors": sum(outcomes.values()),
+            "accepted_ratio": round(accepted / len(rows), 4) if rows else None,
+            "error_counts": dict(outcomes.most_common()),
+            "stored_bids": stored_bids,
+            "missing_bids": accepted - stored_bids,
+            "lost_updates": len(lost_updates),
+            "lost_update_auctions": lost_updates,
+        }
+
+    def write_summary(self, report):
+        latency = report["latency_ms"]
+        self.stdout.write(
+            f"{report['requests']} bids in {report['elapsed_s']} s "
+            f"({report['throughput_rps']} bids/s)"
+        )
+        self.stdout.write(
+            f"Latency ms: p50 {latency['p50']}  p95 {latency['p95']}  "
+            f"p99 {latency['p99']}  max {latency['max']}"
+        )
+        self.stdout.write(
+            f"Accepted {report['accepted']}, rejected {report['rejected']}, "
+            f"errors {report['errors']}"
+        )
+        for error, count in report["error_counts"].items():
+            self.stdout.write(self.style.ERROR(f"  {count} x {error}"))
+        self.stdout.write(
+            f"Stored bids {report['stored_bids']}, "
+            f"missing {report['missing_bids']}"
+        )
+        if report["lost_updates"] or report["missing_bids"]:
+            self.stdout.write(
+                self.style.ERROR(
+                    "Lost updates on auctions "
+                    f"{report['lost_update_auctions']}"
+                )
+            )
+        elif not report["errors"]:
+            self.stdout.write(self.style.SUCCESS("No lost updates"))
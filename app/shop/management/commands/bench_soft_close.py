@@ -0,0 +1,134 @@
+import itertools
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.models import User
+from shop.models import Bid, Product
+from shop.services import BidRejected, get_bid_engine
+
+
+class Command(BaseCommand):
+    """Django command hammering an auction with late bids to test soft close"""
+
+    help = "Place concurrent bids in the soft-close window and verify end_time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bidders", type=int, default=20)
+        parser.add_argument("--ends-in", type=float, default=2.0)
+        parser.add_argument("--duration", type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        if not settings.AUCTION_SOFT_CLOSE_WINDOW:
+            raise CommandError(
+                "Set AUCTION_SOFT_CLOSE_WINDOW to enable soft close first."
+            )
+
+        run = uuid.uuid4().hex[:8]
+        User.objects.bulk_create(
+            User(email=f"bench-{run}-{i}@example.com", name=f"bench {i}")
+            for i in range(options["bidders"] + 1)
+        )
+        users = list(User.objects.filter(email__startswith=f"bench-{run}-"))
+        now = timezone.now()
+        auction = Product.objects.create(
+            slug=f"bench-soft-close-{run}",
+            name="Soft close benchmark",
+            description="Soft close benchmark",
+            user=users[0],
+            region="bench",
+            city="bench",
+            start_time=now - timedelta(minutes=1),
+            end_time=now + timedelta(seconds=options["ends_in"]),
+            bidding_step=Decimal("1"),
+        )
+
+        engine = get_bid_engine()
+        amounts = itertools.count(10, 2)
+        amounts_lock = threading.Lock()
+        placed = []
+        rejected = 0
+        results_lock = threading.Lock()
+        deadline = time.monotonic() + options["duration"]
+
+        def bid(user):
+            nonlocal rejected
+            while time.monotonic() < deadline:
+                with amounts_lock:
+                    amount = Decimal(next(amounts))
+                try:
+                    result = engine.place_bid(auction.id, user, amount)
+                except BidRejected:
+                    with results_lock:
+                        rejected += 1
+                    if timezone.now() >= auction_end():
+                        break
+                    continue
+                with results_lock:
+                    placed.append(result)
+            close_old_connections()
+
+        def auction_end():
+            with results_lock:
+                ends = [result.end_time for result in placed]
+            return max(ends, default=auction.end_time)
+
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=bid, args=(user,)) for user in users[1:]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        engine.flush()
+
+        auction.refresh_from_db()
+        bid_times = list(
+            Bid.objects.filter(auction=auction)
+            .values_list("bid_time", flat=True)
+        )
+        last_bid = max(bid_times, default=None)
+        reported_end = max(
+            (result.end_time for result in placed), default=auction.end_time
+        )
+        min_gap = min(
+            settings.AUCTION_SOFT_CLOSE_WINDOW,
+            settings.AUCTION_SOFT_CLOSE_EXTENSION,
+        )
+        extensions = sum(result.extended for result in placed)
+
+        self.stdout.write(
+            f"Accepted bids: {len(placed)} ({len(bid_times)} stored)"
+        )
+        self.stdout.write(f"Rejected bids: {rejected}")
+        self.stdout.write(f"Extensions: {extensions}")
+        self.stdout.write(f"Elapsed: {elapsed:.2f} s")
+        self.stdout.write(f"Final end_time: {auction.end_time}")
+
+        problems = []
+        if len(bid_times) != len(placed):
+            problems.append("stored bids differ from accepted bids")
+        if auction.end_time != reported_end:
+            problems.append(
+                "stored end_time differs from the latest reported one"
+            )
+        if last_bid and last_bid >= auction.end_time:
+            problems.append("a bid was accepted after the auction ended")
+        if last_bid and auction.end_time - last_bid < timedelta(
+            seconds=min_gap
+        ):
+            problems.append("the last bid did not extend the auction")
+        for problem in problems:
+            self.stderr.write(problem)
+        if problems:
+            raise CommandError("Soft close is inconsistent.")
+        self.stdout.write(self.style.SUCCESS("Soft close is consistent."))
@@ -0,0 +1,112 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from shop.models import Product
+from shop.services.auction_closing import DeadlineSchedule, close_auctions
+from shop.services.bid_engines import bid_settle_time
+
+
+class Command(BaseCommand):
+    """
+    Django command closing auctions as their end_time passes, once the bids
+    the bid engine accepted before it are stored
+    """
+
+    help = (
+        "Close auctions at their deadline, keeping upcoming deadlines "
+        "in a heap"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--horizon",
+            type=int,
+            default=900,
+            help="Seconds of upcoming deadlines kept in memory",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=5.0,
+            help="Seconds between checks for new or edited auctions",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Close overdue auctions and exit",
+        )
+
+    def handle(self, *args, **options):
+        self.horizon = timedelta(seconds=options["horizon"])
+        self.poll = options["poll"]
+        self.batch_size = options["batch_size"]
+        self.settle_time = bid_settle_time()
+        self.schedule = DeadlineSchedule()
+
+        now = timezone.now()
+        self.loaded_until = now + self.horizon
+        self.synced_at = now
+        self.load(Product.objects.filter(end_time__lte=self.loaded_until))
+        self.stdout.write(f"Scheduled {len(self.schedule)} deadlines")
+
+        if options["once"]:
+            self.close_due(now)
+            return
+
+        while True:
+            close_old_connections()
+            now = timezone.now()
+            self.refresh(now)
+            self.close_due(now)
+
+            next_deadline = self.schedule.next_deadline()
+            wait = self.poll
+            if next_deadline is not None:
+                due_in = next_deadline + self.settle_time - timezone.now()
+                wait = min(wait, due_in.total_seconds())
+            time.sleep(max(wait, 0))
+
+    def load(self, queryset):
+        """Schedule open auctions from an index range of the deadline index"""
+        rows = queryset.filter(
+            is_closed=False, end_time__isnull=False
+        ).values_list("id", "end_time")
+        for auction_id, end_time in rows.iterator():
+            self.schedule.schedule(auction_id, end_time)
+
+    def refresh(self, now):
+        """Slide the horizon forward and pick up recently edited auctions"""
+        if now + self.horizon > self.loaded_until:
+            until = now + self.horizon
+            self.load(
+                Product.objects.filter(
+                    end_time__gt=self.loaded_until, end_time__lte=until
+                )
+            )
+            self.loaded_until = until
+
+        changed = Product.objects.filter(
+            updated_at__gte=self.synced_at
+        ).values_list("id", "end_time", "is_closed")
+        self.synced_at = now
+        for auction_id, end_time, is_closed in changed.iterator():
+            if is_closed or end_time is None or end_time > self.loaded_until:
+                self.schedule.discard(auction_id)
+            else:
+                self.schedule.schedule(auction_id, end_time)
+
+    def close_due(self, now):
+        ended_by = now - self.settle_time
+        due = self.schedule.pop_due(ended_by)
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start:start + self.batch_size]
+            closed = set(close_auctions(batch, now, ended_by))
+            self.stdout.write(f"Closed {len(closed)} auctions")
+
+            # Extended in the meantime (soft close), plan their new deadline
+            self.load(Product.objects.filter(id__in=set(batch) - closed))
@@ -0,0 +1,65 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import User
+from shop.services.history_export import (EXPORT_FORMATS, EXPORT_KINDS,
+                                          ExportUnavailable, export_history)
+
+
+class Command(BaseCommand):
+    """Django command streaming a seller's raw bid or view history to a file"""
+
+    help = (
+        "Export the Bid or UserStats rows of a seller's auctions as CSV "
+        "or Parquet"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("seller", help="Seller id or email")
+        parser.add_argument("kind", choices=tuple(EXPORT_KINDS))
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=EXPORT_FORMATS,
+            default="csv",
+        )
+        parser.add_argument(
+            "--start", type=date.fromisoformat, help="First day (YYYY-MM-DD)"
+        )
+        parser.add_argument(
+            "--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD)"
+        )
+        parser.add_argument(
+            "--output", default="-", help="File to write, '-' for stdout"
+        )
+
+    def handle(self, *args, **options):
+        seller = options["seller"]
+        lookup = {"pk": seller} if seller.isdigit() else {"email": seller}
+        try:
+            seller = User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f"No seller {options['seller']}.")
+        try:
+            chunks = export_history(
+                seller.id,
+                options["kind"],
+                options["file_format"],
+                options["start"],
+                options["end"],
+            )
+        except ExportUnavailable as error:
+            raise CommandError(error)
+        if options["output"] == "-":
+            output = sys.stdout.buffer
+        else:
+            output = open(options["output"], "wb")
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            output.flush()
+            if output is not sys.stdout.buffer:
+                output.close()
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from shop.models import Product
+from shop.services.auction_bid_stats import materialize_bid_stats
+
+
+class Command(BaseCommand):
+    """Django command refreshing the materialized bid statistics of auctions"""
+
+    help = "Recompute AuctionBidStats from the Bid table, run it periodically"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--auction",
+            type=int,
+            action="append",
+            help="Only refresh these auctions",
+        )
+        parser.add_argument(
+            "--open",
+            action="store_true",
+            help="Only refresh auctions still open",
+        )
+
+    def handle(self, *args, **options):
+        auctions = Product.objects.order_by("id")
+        if options["auction"]:
+            auctions = auctions.filter(id__in=options["auction"])
+        if options["open"]:
+            auctions = auctions.filter(is_closed=False)
+
+        batch_size = options["batch_size"]
+        last_id = 0
+        refreshed = 0
+        while True:
+            ids = list(
+                auctions.filter(id__gt=last_id)
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            refreshed += materialize_bid_stats(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed bid stats of {refreshed} auctions")
+        )
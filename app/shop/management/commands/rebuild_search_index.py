@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from shop.services.product_index import reload_product_index
+from shop.services.product_search import get_search_backend
+
+
+class Command(BaseCommand):
+    """Django command re-indexing the text and filters of every product"""
+
+    help = (
+        "Rebuild the product search index and have every worker rebuild its "
+        "product index, after changes saved without signals like "
+        "bulk_create() or queryset update()"
+    )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        reload_product_index()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt the {type(backend).__name__} index, product indexes "
+                "rebuild on their next search"
+            )
+        )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from shop.models import Product
+from shop.services.auction_counters import reconcile_auction_counters
+
+
+class Command(BaseCommand):
+    """Django command rebuilding the denormalized bid counters of auctions"""
+
+    help = (
+        "Recompute bid_count, highest_bidder and last_bid_at from the Bid "
+        "table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--auction",
+            type=int,
+            action="append",
+            help="Only reconcile these auctions",
+        )
+
+    def handle(self, *args, **options):
+        auctions = Product.objects.order_by("id")
+        if options["auction"]:
+            auctions = auctions.filter(id__in=options["auction"])
+
+        batch_size = options["batch_size"]
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(
+                auctions.filter(id__gt=last_id)
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            updated += reconcile_auction_counters(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {updated} auctions"))
@@ -0,0 +1,21 @@
+# Generated by Django 3.1.7 on 2026-10-17 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_proxybid'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['auction', 'bid_time', 'id'], name='bid_auction_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['bid_time', 'id'], name='bid_time_idx'),
+        ),
+    ]
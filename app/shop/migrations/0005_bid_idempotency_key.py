@@ -0,0 +1,22 @@
+# Generated by Django 3.1.7 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_auction_closing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bid',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='bid',
+            constraint=models.UniqueConstraint(fields=('bidder', 'idempotency_key'), name='bid_idempotency_key_unique'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.1.7 on 2026-10-17 01:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shop', '0005_bid_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='highest_bidder',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leading_auctions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='last_bid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.1.7 on 2026-10-17 01:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shop', '0006_auction_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuctionDailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('unique_viewers', models.PositiveIntegerField(default=0)),
+                ('max_bid', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('auction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='shop.product')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auction_daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='auctiondailystats',
+            index=models.Index(fields=['seller', 'day'], name='daily_stats_seller_day_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='auctiondailystats',
+            unique_together={('auction', 'day')},
+        ),
+    ]
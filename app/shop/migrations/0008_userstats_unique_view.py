@@ -0,0 +1,30 @@
+# Generated by Django 3.1.7 on 2026-10-17 01:48
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_views(apps, schema_editor):
+    """Keep the first view of every user and auction"""
+    UserStats = apps.get_model('shop', 'UserStats')
+    first_views = (
+        UserStats.objects.values('user', 'auction')
+        .annotate(first_id=Min('id'))
+        .values('first_id')
+    )
+    UserStats.objects.exclude(id__in=first_views).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_auction_daily_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_views, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userstats',
+            constraint=models.UniqueConstraint(fields=('user', 'auction'), name='userstats_user_auction_unique'),
+        ),
+    ]
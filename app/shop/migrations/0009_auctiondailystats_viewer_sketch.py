@@ -0,0 +1,18 @@
+# Generated by Django 3.1.7 on 2026-10-17 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_userstats_unique_view'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctiondailystats',
+            name='viewer_sketch',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.1.7 on 2026-10-17 02:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shop', '0009_auctiondailystats_viewer_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuctionBidStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+                ('distinct_bidders', models.PositiveIntegerField(default=0)),
+                ('first_bid_at', models.DateTimeField(blank=True, null=True)),
+                ('last_bid_at', models.DateTimeField(blank=True, null=True)),
+                ('seconds_to_first_bid', models.FloatField(blank=True, null=True)),
+                ('bids_per_minute', models.FloatField(default=0)),
+                ('peak_bids_per_minute', models.PositiveIntegerField(default=0)),
+                ('mean_increment_steps', models.FloatField(blank=True, null=True)),
+                ('median_increment_steps', models.FloatField(blank=True, null=True)),
+                ('p90_increment_steps', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+                ('auction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='bid_stats', to='shop.product')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auction_bid_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.1.7 on 2026-10-17 03:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+import shop.models.base_models
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 index of product names and descriptions, SQLite only"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE shop_product_fts USING fts5("
+            "name, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        # Matches in names weigh ten times more than in descriptions
+        cursor.execute(
+            "INSERT INTO shop_product_fts (shop_product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')"
+        )
+        cursor.execute(
+            "INSERT INTO shop_product_fts (rowid, name, description)"
+            " SELECT id, name, description FROM shop_product"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE shop_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_auctionbidstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='shop.product')),
+                ('name', models.TextField()),
+                ('description', models.TextField()),
+                ('document', shop.models.base_models.FullTextField(db_column='shop_product_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'shop_product_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -420,6 +420,25 @@ class Product(models.Model):
     end_time = models.DateTimeField(null=True)
     current_highest_bid= models.DecimalField(max_digits=10, decimal_places=2, null=True)
     bidding_step = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    bid_count = models.PositiveIntegerField(default=0)
+    highest_bidder = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="leading_auctions",
+        null=True,
+        blank=True,
+    )
+    last_bid_at = models.DateTimeField(null=True, blank=True)
+    is_closed = models.BooleanField(default=False)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    winner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="won_auctions",
+        null=True,
+        blank=True,
+    )
+    reserve_met = models.BooleanField(null=True, blank=True)
 
     def __str__(self):
         return self.name
@@ -427,6 +446,12 @@ class Product(models.Model):
     class Meta:
         unique_together = (("user", "slug"),)
         ordering = ["-priority", "-created_at"]
+        indexes = [
+            models.Index(
+                fields=["is_closed", "end_time"], name="product_deadline_idx"
+            ),
+            models.Index(fields=["updated_at"], name="product_updated_idx"),
+        ]
 
 
 class Media(models.Model, ResizeImageMixin):
@@ -541,11 +566,56 @@ class Bid(models.Model):
     bid_amount = models.DecimalField(max_digits=10, decimal_places=2)
     bid_time = models.DateTimeField(default=timezone.now)
     bid_amount = models.DecimalField(max_digits=10, decimal_places=2)    
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["auction", "bid_time", "id"],
+                name="bid_auction_time_idx",
+            ),
+            models.Index(fields=["bid_time", "id"], name="bid_time_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bidder", "idempotency_key"],
+                name="bid_idempotency_key_unique",
+            ),
+        ]
 
     def __str__(self):
         return f'Bid of ${self.bid_amount} on {self.auction.name} by {self.bidder.name}'
 
 
+class ProxyBid(models.Model):
+    """
+    Hidden maximum a bidder is willing to pay, raised automatically by
+    the auction's bidding step whenever the bidder is outbid
+    """
+
+    auction = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="proxy_bids"
+    )
+    bidder = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="proxy_bidder",
+    )
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("auction", "bidder"),)
+
+    def __str__(self):
+        return (
+            f"Proxy bid up to ${self.max_amount} on {self.auction.name}"
+            f" by {self.bidder.name}"
+        )
+
+
 class UserStats(models.Model):
     user = models.ForeignKey(
             settings.AUTH_USER_MODEL,
@@ -556,10 +626,128 @@ class UserStats(models.Model):
     view_timestamp = models.DateTimeField(default=timezone.now)
     bid_count = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "auction"],
+                name="userstats_user_auction_unique",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.auction} - {self.view_timestamp}"
 
 
+class AuctionDailyStats(models.Model):
+    """
+    Bid and view totals of an auction for one day, kept up to date as bids
+    and views are recorded so seller dashboards never scan raw history
+    """
+
+    seller = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="auction_daily_stats",
+    )
+    auction = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    day = models.DateField()
+    bid_count = models.PositiveIntegerField(default=0)
+    view_count = models.PositiveIntegerField(default=0)
+    unique_viewers = models.PositiveIntegerField(default=0)
+    max_bid = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    # HyperLogLog sketch of the day's viewers, merged across rows on read
+    viewer_sketch = models.BinaryField(null=True, blank=True)
+
+    class Meta:
+        unique_together = (("auction", "day"),)
+        indexes = [
+            models.Index(
+                fields=["seller", "day"], name="daily_stats_seller_day_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.auction} - {self.day}"
+
+
+class AuctionBidStats(models.Model):
+    """
+    Bidding activity of an auction, recomputed periodically from its bids
+    by the materialize_bid_stats command. Increments are measured in
+    bidding steps and empty when the auction has no step.
+    """
+
+    auction = models.OneToOneField(
+        Product, on_delete=models.CASCADE, related_name="bid_stats"
+    )
+    seller = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="auction_bid_stats",
+    )
+    bid_count = models.PositiveIntegerField(default=0)
+    distinct_bidders = models.PositiveIntegerField(default=0)
+    first_bid_at = models.DateTimeField(null=True, blank=True)
+    last_bid_at = models.DateTimeField(null=True, blank=True)
+    seconds_to_first_bid = models.FloatField(null=True, blank=True)
+    bids_per_minute = models.FloatField(default=0)
+    peak_bids_per_minute = models.PositiveIntegerField(default=0)
+    mean_increment_steps = models.FloatField(null=True, blank=True)
+    median_increment_steps = models.FloatField(null=True, blank=True)
+    p90_increment_steps = models.FloatField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.auction} bid stats"
+
+
+class FullTextMatch(models.Lookup):
+    """Full-text query against the hidden column of an SQLite FTS5 table"""
+
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class FullTextField(models.TextField):
+    """Hidden column named after its FTS5 table, filtered with __match"""
+
+
+FullTextField.register_lookup(FullTextMatch)
+
+
+class ProductSearchDocument(models.Model):
+    """
+    Row of the FTS5 index of product names and descriptions. The table only
+    exists on SQLite and is written with SQL by the fts5 search backend.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="search_document",
+    )
+    name = models.TextField()
+    description = models.TextField()
+    document = FullTextField(db_column="shop_product_fts")
+    # bm25 rank of the row for the matched query, lower is more relevant
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "shop_product_fts"
+
+
 class ProductMedia(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     main_picture = models.CharField(max_length=255, blank=True, null=True)
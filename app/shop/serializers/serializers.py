@@ -1,12 +1,19 @@
 from django.conf import settings
-from datetime import datetime, date
+from datetime import timedelta
+from decimal import Decimal
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
+from django.db.models import Prefetch
+from django.utils import timezone
 from rest_framework import serializers
 
-from shop.models import (Brand, Category, Media, Product, ProductMedia, ProductImages, Bid, UserStats, ProductAttribute,
-                         ProductAttributeValue, ProductAttributeValues,
-                         ProductType)
+from shop.models import (AuctionBidStats, Bid, Brand, Category, Media,
+                         Product, ProductAttribute, ProductAttributeValue,
+                         ProductAttributeValues, ProductImages, ProductMedia,
+                         ProductType, ProxyBid, UserStats)
+from shop.services.bid_engines import get_bid_engine
+from shop.services.bidding import lowest_outbid
+from shop.services.chart_series import CHART_GRANULARITIES
+from shop.services.history_export import EXPORT_FORMATS
 from user.serializers import UserSerializer
 
 
@@ -110,11 +117,7 @@ class ProductAttributeValueDetailedSerializer(ProductAttributeValueSerializer):
     product_attribute = serializers.SerializerMethodField()
 
     def get_product_attribute(self, obj):
-        try:
-            product_att = ProductAttribute.objects.get(id=obj.product_attribute.id)
-            return product_att.name
-        except ProductAttribute.DoesNotExist:
-            return ""
+        return obj.product_attribute.name
 
     class Meta:
         model = ProductAttributeValue
@@ -190,24 +193,46 @@ class ProductImageSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "uri")
 
 
+def default_media(product):
+    """The product's default image, from the default_media prefetch if any"""
+    if hasattr(product, "default_media"):
+        return product.default_media[0] if product.default_media else None
+    return Media.objects.filter(product=product, default=True).first()
+
+
 class ProductSerializer(CustomModelSerializer):
     """Serializer for shop product"""
 
     image = serializers.SerializerMethodField()
     # images = ProductImageSerializer(source='media_product', many=True)
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the default images and many-to-many fields of products"""
+        return queryset.prefetch_related(
+            "category",
+            "attribute_values",
+            Prefetch(
+                "media_product",
+                queryset=Media.objects.filter(default=True),
+                to_attr="default_media",
+            ),
+        )
+
     def get_image(self, product):
-        try:
-            qs = Media.objects.get(product=product, default=True)
-            serializer = ProductImageSerializer(instance=qs)
-            return serializer.data["thumbnail"]
-        except Media.DoesNotExist:
+        media = default_media(product)
+        if media is None:
             return "noimage"
+        serializer = ProductImageSerializer(instance=media)
+        return serializer.data["thumbnail"]
 
     class Meta:
         model = Product
         fields = '__all__' 
-        read_only_fields = ("id",)
+        read_only_fields = (
+            "id", "bid_count", "highest_bidder", "last_bid_at",
+            "is_closed", "closed_at", "winner", "reserve_met",
+        )
 
 
 class ProductDetailSerializer(ProductSerializer):
@@ -223,27 +248,39 @@ class ProductDetailSerializer(ProductSerializer):
     attribute_values = ProductAttributeValueDetailedSerializer(many=True)
     user = UserSerializer()
 
-    def get_image(self, product):
-        try:
-            qs = Media.objects.get(product=product, default=True)
-            serializer = ProductImageSerializer(instance=qs)
-            return serializer.data["thumbnail"]
-        except Media.DoesNotExist:
-            return "noimage"
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load the seller, type, categories, images and attribute values of
+        products in bulk
+        """
+        values = ProductAttributeValue.objects.select_related(
+            "product_attribute"
+        )
+        return queryset.select_related(
+            "user", "product_type"
+        ).prefetch_related(
+            "category",
+            "media_product",
+            Prefetch("attribute_values", queryset=values),
+            Prefetch(
+                "media_product",
+                queryset=Media.objects.filter(default=True),
+                to_attr="default_media",
+            ),
+        )
 
     def get_uri(self, product):
-        try:
-            qs = Media.objects.get(product=product, default=True)
-            serializer = ProductImageSerializer(instance=qs)
-            return serializer.data["thumbnail"]
-        except Media.DoesNotExist:
-            return "noimage"
+        return self.get_image(product)
 
     class Meta:
         model = Product
         fields = '__all__'
         extra_fields = ['images', 'uri']
-        read_only_fields = ("id",)
+        read_only_fields = (
+            "id", "bid_count", "highest_bidder", "last_bid_at",
+            "is_closed", "closed_at", "winner", "reserve_met",
+        )
 
 
 class BidSerializer(serializers.ModelSerializer):
@@ -252,51 +289,102 @@ class BidSerializer(serializers.ModelSerializer):
         fields = ('id', 'auction', 'is_active', 'bid_amount', 'bid_time', 'bid_amount')
         read_only_fields = ("id",)
 
+
+class PlaceBidSerializer(serializers.Serializer):
+    """Auction and amount of a bid, held to what Bid.bid_amount can store"""
+    auction = serializers.IntegerField()
+    bid_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal("0.01")
+    )
+
+
+class ProxyBidSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProxyBid
+        fields = ('id', 'auction', 'max_amount', 'is_active', 'created_at')
+        read_only_fields = ("id", "is_active", "created_at")
+
+    def validate(self, data):
+        auction = data["auction"]
+        if auction.user_id == self.context["request"].user.id:
+            raise serializers.ValidationError(
+                "You cannot bid on your own auction."
+            )
+        # The bid engine may hold bids not stored yet
+        snapshot = get_bid_engine().snapshot(auction.id)
+        now = timezone.now()
+        if not (
+            snapshot.start_time
+            and snapshot.end_time
+            and snapshot.start_time < now < snapshot.end_time
+        ):
+            raise serializers.ValidationError(
+                "Bid can only be placed within the specified time frame."
+            )
+        lowest = lowest_outbid(snapshot.highest_bid, snapshot.bidding_step)
+        if lowest is not None and data["max_amount"] < lowest:
+            raise serializers.ValidationError(
+                f"Maximum bid must be at least {lowest} to outbid the current"
+                f" highest bid amount"
+            )
+        return data
+
+
 class UserStatsSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserStats
         fields = ('id', 'auction', 'view_timestamp', 'bid_count')
 
 
-class CustomDateField(serializers.ReadOnlyField):
-    def to_representation(self, value):
-        if value:
-            # Format the date as the full weekday name (e.g., Monday)
-            return value.strftime('%A')
-            
-        return None
+class AuctionBidStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuctionBidStats
+        exclude = ('id', 'seller')
 
-class BidChartSerializer(serializers.Serializer):
-    bid_time__date = CustomDateField()  # Use the custom date field
-    bid_count = serializers.IntegerField()
 
-    def __init__(self, bid_data, *args, **kwargs):
-        super(BidChartSerializer, self).__init__(*args, **kwargs)
-        self.bid_data__date = bid_data
+class ChartQuerySerializer(serializers.Serializer):
+    """Range and bucket size of a chart series, by day for 30 days"""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    granularity = serializers.ChoiceField(
+        choices=CHART_GRANULARITIES, default="day"
+    )
+
+    default_days = 30
+
+    def validate(self, data):
+        data.setdefault("end", timezone.localdate())
+        data.setdefault(
+            "start", data["end"] - timedelta(days=self.default_days - 1)
+        )
+        if data["start"] > data["end"]:
+            raise serializers.ValidationError("start must not be after end.")
+        if (data["end"] - data["start"]).days >= settings.DASHBOARD_MAX_DAYS:
+            raise serializers.ValidationError(
+                f"The range spans at most {settings.DASHBOARD_MAX_DAYS} days."
+            )
+        return data
+
+
+class HistoryExportQuerySerializer(serializers.Serializer):
+    """Days and file format of a bid or view history export, CSV by default"""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    file_format = serializers.ChoiceField(
+        choices=EXPORT_FORMATS, default="csv"
+    )
+
+    def validate(self, data):
+        start, end = data.get("start"), data.get("end")
+        if start and end and start > end:
+            raise serializers.ValidationError("start must not be after end.")
+        return data
+
+
+class PriceHistoryQuerySerializer(serializers.Serializer):
+    """Point budget of a downsampled price history"""
+    points = serializers.IntegerField(min_value=3, max_value=5000, default=500)
 
-    def to_representation(self, instance):
-        # Map bid_time__date to bid_count
-        return {
-            'bid_date': instance['bid_time__date'],
-            'bid_count': instance['bid_count']
-        }
-    
-    
-class ViewChartSerializer(serializers.Serializer):
-    view_timestamp__date = CustomDateField()  # Define the custom date field for the view time
-    view_count = serializers.IntegerField()
-
-
-    def __init__(self, view_data, *args, **kwargs):
-        super(ViewChartSerializer, self).__init__(*args, **kwargs)
-        self.view_data = view_data
-
-    def to_representation(self, instance):
-        # Map view_date to view_count
-        return {
-            'view_date': instance['view_date'],
-            'view_count': instance['view_count']
-        }
 
 class ImageSerializer(serializers.Serializer):
     pass
@@ -0,0 +1,18 @@
+from .auction_events import *
+from .bidding import *
+from .bid_engines import *
+from .proxy_bidding import *
+from .auction_closing import *
+from .idempotency import *
+from .auction_counters import *
+from .analytics_cache import *
+from .viewer_sketches import *
+from .auction_rollups import *
+from .view_buffer import *
+from .dashboard import *
+from .chart_series import *
+from .history_export import *
+from .price_history import *
+from .auction_bid_stats import *
+from .product_index import *
+from .product_search import *
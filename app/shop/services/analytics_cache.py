@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.metrics import metrics
+from shop.models import Product
+
+logger = logging.getLogger(__name__)
+
+_sellers = {}
+_sellers_lock = threading.Lock()
+
+
+def auction_sellers(auction_ids):
+    """Map auction ids to their seller ids, which never change"""
+    missing = [
+        auction_id for auction_id in auction_ids if auction_id not in _sellers
+    ]
+    if missing:
+        found = dict(
+            Product.objects.filter(id__in=missing).values_list("id", "user_id")
+        )
+        with _sellers_lock:
+            if len(_sellers) > settings.ANALYTICS_SELLER_MEMO_SIZE:
+                _sellers.clear()
+            _sellers.update(found)
+    return {
+        auction_id: _sellers[auction_id]
+        for auction_id in auction_ids
+        if auction_id in _sellers
+    }
+
+
+def seller_version_key(seller_id):
+    return f"shop:analytics-version:{seller_id}"
+
+
+def seller_version(seller_id):
+    """
+    Version of a seller's bid and view data, part of every cached analytics
+    key. Versions are random so an evicted version can never make stale
+    answers valid again.
+    """
+    key = seller_version_key(seller_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def new_seller_versions(seller_ids):
+    return {
+        seller_version_key(seller_id): uuid.uuid4().hex
+        for seller_id in seller_ids
+    }
+
+
+def bump_seller_versions(auction_ids):
+    """
+    Replace the data versions of the sellers of the given auctions, so
+    their cached analytics are recomputed on next read. Old entries are
+    never looked up again and simply expire.
+    """
+    seller_ids = set(auction_sellers(auction_ids).values())
+    cache.set_many(new_seller_versions(seller_ids), None)
+
+
+def bump_seller_versions_on_commit(auction_ids):
+    """
+    Bump the data versions of the sellers of the given auctions once the
+    current transaction commits. The sellers are looked up right away so
+    that only the cache is written after the commit, and a failed write
+    is logged instead of failing the committed bids and views; the cached
+    answers it leaves expire after ANALYTICS_CACHE_TTL seconds.
+    """
+    seller_ids = set(auction_sellers(auction_ids).values())
+
+    def bump():
+        try:
+            cache.set_many(new_seller_versions(seller_ids), None)
+        except Exception:
+            logger.exception(
+                "Failed to bump the analytics versions of sellers %s",
+                sorted(seller_ids),
+            )
+
+    transaction.on_commit(bump)
+
+
+def cached_answer(name, key_parts, compute):
+    """
+    Answer of compute() cached under the name and key parts for at most
+    ANALYTICS_CACHE_TTL seconds. Lookups count as analytics_cache.<name>.hits
+    or .misses and recomputes are timed as analytics_cache.<name>.recompute.
+    """
+    key = ":".join(
+        ["shop:analytics", name] + [str(part) for part in key_parts]
+    )
+    answer = cache.get(key)
+    if answer is not None:
+        metrics.incr(f"analytics_cache.{name}.hits")
+        return answer
+
+    metrics.incr(f"analytics_cache.{name}.misses")
+    started = time.perf_counter()
+    answer = compute()
+    metrics.observe(
+        f"analytics_cache.{name}.recompute", time.perf_counter() - started
+    )
+    cache.set(key, answer, settings.ANALYTICS_CACHE_TTL)
+    return answer
+
+
+def cached_analytics(name, seller_id, params, compute):
+    """
+    Answer of compute() for the seller and params, cached until the seller's
+    data version changes
+    """
+    return cached_answer(
+        name, (seller_id, seller_version(seller_id), *params), compute
+    )
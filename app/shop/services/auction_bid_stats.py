@@ -0,0 +1,186 @@
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from shop.models import AuctionBidStats, Bid, Product
+
+
+def optional(value):
+    """numpy value as a Python float, None for NaN"""
+    return None if np.isnan(value) else float(value)
+
+
+def grouped_percentile(groups, values, group_count, fraction):
+    """
+    Linearly interpolated percentile of the values of every group, NaN for
+    empty groups
+    """
+    order = np.lexsort((values, groups))
+    values = values[order]
+    counts = np.bincount(groups, minlength=group_count)
+    starts = np.cumsum(counts) - counts
+    result = np.full(group_count, np.nan)
+    present = counts > 0
+    position = (counts[present] - 1) * fraction
+    low = np.floor(position).astype(np.intp)
+    high = np.ceil(position).astype(np.intp)
+    low_values = values[starts[present] + low]
+    high_values = values[starts[present] + high]
+    spread = high_values - low_values
+    result[present] = low_values + spread * (position - low)
+    return result
+
+
+def compute_bid_stats(auction_ids):
+    """
+    Bidding statistics of many auctions as unsaved AuctionBidStats.
+
+    Reads the bids of all the auctions with one query, ordered by auction
+    and time, and computes every statistic with grouped numpy operations
+    over the resulting arrays instead of one aggregate query per auction.
+    """
+    auctions = sorted(
+        Product.objects.filter(id__in=auction_ids).values_list(
+            "id", "user_id", "start_time", "bidding_step"
+        )
+    )
+    if not auctions:
+        return []
+    ids, seller_ids, start_times, steps = zip(*auctions)
+    group_count = len(ids)
+    start_seconds = np.array(
+        [start.timestamp() if start else np.nan for start in start_times],
+        dtype=np.float64,
+    )
+    step_sizes = np.array(
+        [step if step else np.nan for step in steps], dtype=np.float64
+    )
+
+    bids = list(
+        Bid.objects.filter(auction_id__in=ids)
+        .order_by("auction_id", "bid_time", "id")
+        .values_list("auction_id", "bidder_id", "bid_amount", "bid_time")
+    )
+    if bids:
+        auction_column, bidders, amounts, times = zip(*bids)
+    else:
+        auction_column, bidders, amounts, times = (), (), (), ()
+    groups = np.searchsorted(
+        np.array(ids), np.array(auction_column, dtype=np.int64)
+    )
+    bidders = np.array(bidders, dtype=np.int64)
+    amounts = np.array(amounts, dtype=np.float64)
+    seconds = np.array([time.timestamp() for time in times], dtype=np.float64)
+
+    counts = np.bincount(groups, minlength=group_count)
+    present = counts > 0
+    ends = np.cumsum(counts)
+    first = np.full(group_count, np.nan)
+    last = np.full(group_count, np.nan)
+    first[present] = seconds[ends[present] - counts[present]]
+    last[present] = seconds[ends[present] - 1]
+
+    bidder_pairs = np.unique(np.stack([groups, bidders]), axis=1)
+    distinct_bidders = np.bincount(bidder_pairs[0], minlength=group_count)
+
+    minute_pairs, per_minute = np.unique(
+        np.stack([groups, np.floor(seconds / 60).astype(np.int64)]),
+        axis=1,
+        return_counts=True,
+    )
+    peak_per_minute = np.zeros(group_count, dtype=np.int64)
+    np.maximum.at(peak_per_minute, minute_pairs[0], per_minute)
+
+    # Bidding rate from the auction start, or its first bid, to its last bid
+    window_start = np.where(np.isnan(start_seconds), first, start_seconds)
+    minutes = np.maximum((last - window_start) / 60, 1)
+    bids_per_minute = np.where(present, counts / minutes, 0)
+
+    # Raises between consecutive bids of an auction, in bidding steps
+    same_auction = groups[1:] == groups[:-1]
+    increment_groups = groups[1:][same_auction]
+    increments = np.diff(amounts)[same_auction] / step_sizes[increment_groups]
+    measured = ~np.isnan(increments)
+    increment_groups = increment_groups[measured]
+    increments = increments[measured]
+    increment_counts = np.bincount(increment_groups, minlength=group_count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_increments = (
+            np.bincount(
+                increment_groups, weights=increments, minlength=group_count
+            )
+            / increment_counts
+        )
+    median_increments = grouped_percentile(
+        increment_groups, increments, group_count, 0.5
+    )
+    p90_increments = grouped_percentile(
+        increment_groups, increments, group_count, 0.9
+    )
+
+    now = timezone.now()
+    stats = []
+    for group, auction_id in enumerate(ids):
+        has_bids = bool(present[group])
+        first_index = ends[group] - counts[group]
+        stats.append(
+            AuctionBidStats(
+                auction_id=auction_id,
+                seller_id=seller_ids[group],
+                bid_count=int(counts[group]),
+                distinct_bidders=int(distinct_bidders[group]),
+                first_bid_at=times[first_index] if has_bids else None,
+                last_bid_at=times[ends[group] - 1] if has_bids else None,
+                seconds_to_first_bid=optional(
+                    first[group] - start_seconds[group]
+                ),
+                bids_per_minute=float(bids_per_minute[group]),
+                peak_bids_per_minute=int(peak_per_minute[group]),
+                mean_increment_steps=optional(mean_increments[group]),
+                median_increment_steps=optional(median_increments[group]),
+                p90_increment_steps=optional(p90_increments[group]),
+                computed_at=now,
+            )
+        )
+    return stats
+
+
+def materialize_bid_stats(auction_ids):
+    """Recompute and store the bid statistics of auctions, returns how many"""
+    stats = compute_bid_stats(auction_ids)
+    with transaction.atomic():
+        AuctionBidStats.objects.filter(auction_id__in=auction_ids).delete()
+        AuctionBidStats.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
+
+
+def seller_bid_stats(seller_id, hottest=10):
+    """Summary of the materialized bid statistics of a seller's auctions"""
+    stats = AuctionBidStats.objects.filter(seller_id=seller_id)
+    rows = list(
+        stats.values_list(
+            "bid_count", "seconds_to_first_bid", "bids_per_minute"
+        )
+    )
+    if rows:
+        # Missing times to first bid become NaN
+        bid_counts, to_first_bid, rates = (
+            np.array(column, dtype=np.float64) for column in zip(*rows)
+        )
+    else:
+        bid_counts = to_first_bid = rates = np.zeros(0)
+    with_bids = bid_counts > 0
+    timed = ~np.isnan(to_first_bid)
+    busiest = stats.filter(bid_count__gt=0).order_by("-bids_per_minute")
+    return {
+        "auctions": len(rows),
+        "auctions_with_bids": int(with_bids.sum()),
+        "bids": int(bid_counts.sum()),
+        "mean_bids_per_minute": (
+            float(rates[with_bids].mean()) if with_bids.any() else None
+        ),
+        "median_seconds_to_first_bid": (
+            float(np.median(to_first_bid[timed])) if timed.any() else None
+        ),
+        "hottest": list(busiest[:hottest]),
+    }
@@ -0,0 +1,102 @@
+import heapq
+
+from django.db import transaction
+from django.db.models import (BooleanField, Case, F, OuterRef, Q, Subquery,
+                              Value, When)
+
+from shop.models import Bid, Product
+
+
+class DeadlineSchedule:
+    """
+    Min-heap of auction deadlines with lazy invalidation.
+
+    Rescheduling an auction pushes a new entry and remembers its deadline;
+    stale entries are skipped when they reach the top of the heap.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, auction_id, end_time):
+        if self._deadlines.get(auction_id) == end_time:
+            return
+        self._deadlines[auction_id] = end_time
+        heapq.heappush(self._heap, (end_time, auction_id))
+
+    def discard(self, auction_id):
+        self._deadlines.pop(auction_id, None)
+
+    def next_deadline(self):
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and return the ids of all auctions ending at or before now"""
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            _, auction_id = heapq.heappop(self._heap)
+            del self._deadlines[auction_id]
+            due.append(auction_id)
+
+    def _drop_stale(self):
+        while self._heap:
+            end_time, auction_id = self._heap[0]
+            if self._deadlines.get(auction_id) == end_time:
+                return
+            heapq.heappop(self._heap)
+
+
+def close_auctions(auction_ids, now, ended_by=None):
+    """
+    Close the given auctions whose end_time has passed, in one batch.
+
+    Freezes the auction, records the reserve price outcome and marks the
+    highest bidder as winner unless the reserve was missed, all in a single
+    UPDATE. Only auctions ending by ended_by (now by default) are closed,
+    so that callers can wait for bids still being stored. Returns the ids
+    that were closed; auctions extended in the meantime are left open.
+    """
+    top_bidder = (
+        Bid.objects.filter(auction=OuterRef("pk"))
+        .order_by("-bid_amount", "bid_time")
+        .values("bidder_id")[:1]
+    )
+    reserve_met = Case(
+        When(reserve_price_status=False, then=Value(None)),
+        When(current_highest_bid__gte=F("reserve_price"), then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(null=True),
+    )
+    reserve_missed = Q(reserve_price_status=True) & (
+        Q(current_highest_bid__isnull=True)
+        | Q(current_highest_bid__lt=F("reserve_price"))
+    )
+
+    with transaction.atomic():
+        closed = list(
+            Product.objects.select_for_update()
+            .filter(
+                id__in=auction_ids,
+                is_closed=False,
+                end_time__lte=ended_by or now,
+            )
+            .values_list("id", flat=True)
+        )
+        Product.objects.filter(id__in=closed).update(
+            is_closed=True,
+            closed_at=now,
+            reserve_met=reserve_met,
+            winner=Case(
+                When(reserve_missed, then=Value(None)),
+                default=Subquery(top_bidder),
+            ),
+        )
+    return closed
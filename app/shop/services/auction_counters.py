@@ -0,0 +1,31 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from shop.models import Bid, Product
+
+
+def reconcile_auction_counters(auction_ids):
+    """
+    Recompute the bid counters of the given auctions from the Bid table.
+
+    Accepted bids keep bid_count, highest_bidder and last_bid_at up to date,
+    this repairs them after imports or manual edits. Each call is a single
+    UPDATE with correlated subqueries, no bids are loaded into Python.
+    Returns the number of auctions updated.
+    """
+    bids = Bid.objects.filter(auction=OuterRef("pk")).order_by()
+    bid_count = (
+        bids.values("auction").annotate(total=Count("id")).values("total")
+    )
+    top_bidder = (
+        bids.order_by("-bid_amount", "bid_time").values("bidder_id")[:1]
+    )
+    last_bid_at = bids.order_by("-bid_time").values("bid_time")[:1]
+
+    return Product.objects.filter(id__in=auction_ids).update(
+        bid_count=Coalesce(
+            Subquery(bid_count, output_field=IntegerField()), Value(0)
+        ),
+        highest_bidder=Subquery(top_bidder),
+        last_bid_at=Subquery(last_bid_at),
+    )
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+BID_EVENT = "bid"
+EXTENDED_EVENT = "extended"
+CLOSED_EVENT = "closed"
+
+
+def encode_event(event, data):
+    """Encode an event once as a Server-Sent Events message"""
+    payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n".encode()
+
+
+class AuctionEventHub:
+    """
+    In-process publisher fanning auction events out to stream subscribers.
+
+    Subscribers are asyncio queues living on an event loop, while events are
+    usually published from the sync bid path running in another thread. Each
+    event is encoded once and handed to every loop with a single
+    call_soon_threadsafe, which then fills the queues of that loop.
+    Queues receive (event, data, encoded message) tuples.
+    """
+
+    def __init__(self, queue_size=8):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, auction_id):
+        """Register a queue for the auction, call it on the event loop"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.queue_size)
+        with self._lock:
+            loops = self._subscribers.setdefault(auction_id, {})
+            loops.setdefault(loop, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, auction_id, queue):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            loops = self._subscribers.get(auction_id)
+            if not loops:
+                return
+            queues = loops.get(loop)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del loops[loop]
+            if not loops:
+                del self._subscribers[auction_id]
+
+    def subscriber_count(self, auction_id=None):
+        with self._lock:
+            if auction_id is not None:
+                loops = self._subscribers.get(auction_id, {})
+                return sum(len(queues) for queues in loops.values())
+            return sum(
+                len(queues)
+                for loops in self._subscribers.values()
+                for queues in loops.values()
+            )
+
+    def publish(self, auction_id, event, data):
+        """Send an event to every subscriber of the auction, from any thread"""
+        with self._lock:
+            loops = self._subscribers.get(auction_id)
+            if not loops:
+                return
+            targets = [(loop, tuple(queues)) for loop, queues in loops.items()]
+
+        message = (event, data, encode_event(event, data))
+        for loop, queues in targets:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._deliver, queues, message)
+
+    @staticmethod
+    def _deliver(queues, message):
+        for queue in queues:
+            if queue.full():
+                # Slow subscriber, drop its oldest event to keep memory bounded
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+
+auction_events = AuctionEventHub()
+
+
+def publish_highest_bid(bid):
+    """Announce a new highest bid to the auction's stream subscribers"""
+    auction_events.publish(
+        bid.auction_id,
+        BID_EVENT,
+        {
+            "amount": bid.bid_amount,
+            "bidder": bid.bidder_id,
+            "time": bid.bid_time,
+        },
+    )
+
+
+def publish_extended(auction_id, end_time):
+    """Announce a soft-close extension of the auction's end_time"""
+    auction_events.publish(auction_id, EXTENDED_EVENT, {"end_time": end_time})
+
+
+def publish_placed_bid(placed):
+    """Announce an accepted bid and the extension it caused, if any"""
+    publish_highest_bid(placed.bid)
+    if placed.extended:
+        publish_extended(placed.bid.auction_id, placed.end_time)
@@ -0,0 +1,240 @@
+from heapq import merge
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Max, Q, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from shop.models import AuctionDailyStats, Bid, Product, UserStats
+from shop.services.analytics_cache import bump_seller_versions_on_commit
+from shop.services.viewer_sketches import HyperLogLog, add_viewers_to_sketches
+
+
+# Sources of the rows merged by rebuild_rollups
+BID_TOTALS, VIEW_TOTALS, VIEWER_SKETCH = range(3)
+
+
+def rollup_day(moment):
+    """Day a bid or view at the given moment is counted in"""
+    return timezone.localdate(moment)
+
+
+def rollup_changes(bid_count=0, view_count=0, unique_viewers=0, max_bid=None):
+    """Expressions adding bids and views to the columns of a rollup row"""
+    changes = {
+        "bid_count": F("bid_count") + bid_count,
+        "view_count": F("view_count") + view_count,
+        "unique_viewers": F("unique_viewers") + unique_viewers,
+    }
+    if max_bid is not None:
+        changes["max_bid"] = Case(
+            When(
+                Q(max_bid__isnull=True) | Q(max_bid__lt=max_bid),
+                then=Value(max_bid),
+            ),
+            default=F("max_bid"),
+        )
+    return changes
+
+
+def add_to_rollup(auction_id, day, **totals):
+    """
+    Add bids and views to the auction's rollup of the day.
+
+    The row is updated in place and only created on the auction's first
+    bid or view of the day. Callers placing bids hold the auction row lock,
+    views may race them on the insert, in which case the update is retried.
+    The seller's cached analytics are invalidated once the change commits.
+    """
+    bump_seller_versions_on_commit([auction_id])
+    rollup = AuctionDailyStats.objects.filter(auction_id=auction_id, day=day)
+    if rollup.update(**rollup_changes(**totals)):
+        return
+
+    seller_id = Product.objects.values_list("user_id", flat=True).get(
+        pk=auction_id
+    )
+    try:
+        with transaction.atomic():
+            AuctionDailyStats.objects.create(
+                seller_id=seller_id, auction_id=auction_id, day=day, **totals
+            )
+    except IntegrityError:
+        rollup.update(**rollup_changes(**totals))
+
+
+def add_to_rollups(totals):
+    """
+    Add bids and views to many rollups, given as {(auction id, day): totals}.
+
+    A single rollup goes through add_to_rollup. Otherwise existing rows
+    are updated with one bulk update and missing rows created with one
+    bulk insert; should another worker create one of them first, those
+    rollups fall back to add_to_rollup.
+    """
+    if len(totals) == 1:
+        [((auction_id, day), rollup_totals)] = totals.items()
+        add_to_rollup(auction_id, day, **rollup_totals)
+        return
+
+    auction_ids = {auction_id for auction_id, _ in totals}
+    bump_seller_versions_on_commit(auction_ids)
+    existing = {
+        (auction_id, day): rollup_id
+        for rollup_id, auction_id, day in AuctionDailyStats.objects.filter(
+            auction_id__in=auction_ids, day__in={day for _, day in totals}
+        ).values_list("id", "auction_id", "day")
+    }
+
+    # Callers pass either bids or views, every rollup changes the same columns
+    updated = [
+        AuctionDailyStats(id=rollup_id, **rollup_changes(**totals[key]))
+        for key, rollup_id in existing.items()
+    ]
+    if updated:
+        columns = list(rollup_changes(**next(iter(totals.values()))))
+        AuctionDailyStats.objects.bulk_update(updated, columns)
+
+    missing = [key for key in totals if key not in existing]
+    if not missing:
+        return
+    missing_auctions = {auction_id for auction_id, _ in missing}
+    sellers = dict(
+        Product.objects.filter(id__in=missing_auctions)
+        .values_list("id", "user_id")
+    )
+    try:
+        with transaction.atomic():
+            AuctionDailyStats.objects.bulk_create(
+                AuctionDailyStats(
+                    seller_id=sellers[auction_id],
+                    auction_id=auction_id,
+                    day=day,
+                    **totals[(auction_id, day)],
+                )
+                for auction_id, day in missing
+            )
+    except IntegrityError:
+        for auction_id, day in missing:
+            add_to_rollup(auction_id, day, **totals[(auction_id, day)])
+
+
+def record_bids_in_rollups(bids):
+    """Count accepted bids, grouped by auction and day"""
+    totals = {}
+    for bid in bids:
+        key = (bid.auction_id, rollup_day(bid.bid_time))
+        group = totals.setdefault(
+            key, {"bid_count": 0, "max_bid": bid.bid_amount}
+        )
+        group["bid_count"] += 1
+        group["max_bid"] = max(group["max_bid"], bid.bid_amount)
+    add_to_rollups(totals)
+
+
+def record_views_in_rollups(views):
+    """
+    Count newly recorded views, grouped by auction and day, and add their
+    users to the viewer sketches. A single view is stored per user and
+    auction, so every one is also a new unique viewer.
+    """
+    viewers = {}
+    for view in views:
+        key = (view.auction_id, rollup_day(view.view_timestamp))
+        viewers.setdefault(key, []).append(view.user_id)
+    add_to_rollups(
+        {
+            key: {"view_count": len(user_ids), "unique_viewers": len(user_ids)}
+            for key, user_ids in viewers.items()
+        }
+    )
+    add_viewers_to_sketches(viewers)
+
+
+def rebuild_rollups(since=None, batch_size=1000):
+    """
+    Recompute the rollups and viewer sketches from the Bid and UserStats
+    tables.
+
+    Rollups from the since day on, or all of them, are replaced in one
+    transaction. Bid totals, view totals and viewers are streamed ordered
+    by auction and day and merged, so each rollup is built from its own
+    rows only and written in batches of batch_size as soon as it is
+    complete. Returns the number of rollup rows written.
+    """
+    bids = Bid.objects.all()
+    views = UserStats.objects.all()
+    rollups = AuctionDailyStats.objects.all()
+    if since is not None:
+        bids = bids.filter(bid_time__date__gte=since)
+        views = views.filter(view_timestamp__date__gte=since)
+        rollups = rollups.filter(day__gte=since)
+
+    bid_totals = (
+        bids.annotate(day=TruncDate("bid_time"))
+        .values("auction_id", "auction__user_id", "day")
+        .annotate(total=Count("id"), highest=Max("bid_amount"))
+        .order_by("auction_id", "day")
+    )
+    view_totals = (
+        views.annotate(day=TruncDate("view_timestamp"))
+        .values("auction_id", "auction__user_id", "day")
+        .annotate(total=Count("id"), viewers=Count("user", distinct=True))
+        .order_by("auction_id", "day")
+    )
+    viewers = (
+        views.annotate(day=TruncDate("view_timestamp"))
+        .values_list("auction_id", "day", "user_id")
+        .order_by("auction_id", "day")
+    )
+
+    def totals_of(rows, source):
+        for row in rows:
+            yield (row["auction_id"], row["day"]), source, row
+
+    def sketches_of(rows, source):
+        for key, group in groupby(rows, key=itemgetter(0, 1)):
+            user_ids = [user_id for _, _, user_id in group]
+            yield key, source, HyperLogLog().add(user_ids).to_bytes()
+
+    # The source breaks ties between equal keys, values are never compared
+    streams = merge(
+        totals_of(bid_totals.iterator(), BID_TOTALS),
+        totals_of(view_totals.iterator(), VIEW_TOTALS),
+        sketches_of(viewers.iterator(), VIEWER_SKETCH),
+        key=itemgetter(0, 1),
+    )
+
+    written = 0
+    with transaction.atomic():
+        auction_ids = set(
+            rollups.values_list("auction_id", flat=True).distinct()
+        )
+        bump_seller_versions_on_commit(auction_ids)
+        rollups.delete()
+
+        batch = []
+        for (auction_id, day), parts in groupby(streams, key=itemgetter(0)):
+            rollup = AuctionDailyStats(auction_id=auction_id, day=day)
+            for _, source, value in parts:
+                if source == BID_TOTALS:
+                    rollup.seller_id = value["auction__user_id"]
+                    rollup.bid_count = value["total"]
+                    rollup.max_bid = value["highest"]
+                elif source == VIEW_TOTALS:
+                    rollup.seller_id = value["auction__user_id"]
+                    rollup.view_count = value["total"]
+                    rollup.unique_viewers = value["viewers"]
+                else:
+                    rollup.viewer_sketch = value
+            auction_ids.add(auction_id)
+            batch.append(rollup)
+            if len(batch) >= batch_size:
+                AuctionDailyStats.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        AuctionDailyStats.objects.bulk_create(batch)
+        written += len(batch)
+    return written
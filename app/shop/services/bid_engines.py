@@ -0,0 +1,569 @@
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+
+from core.metrics import metrics
+from shop.models import Bid, Product
+from shop.services.auction_events import publish_placed_bid
+from shop.services.auction_rollups import record_bids_in_rollups
+from shop.services.bidding import (AUCTION_NOT_OPEN, BID_TOO_LOW,
+                                   AuctionSnapshot, BidRejected, DuplicateBid,
+                                   PlacedBid, auction_snapshot, commit_bids,
+                                   find_duplicate_bid, outbid_in_turn, outbids,
+                                   place_bid, soft_close_end_time)
+
+logger = logging.getLogger(__name__)
+
+
+def unstored_bids(bids):
+    """
+    The given bids but those repeating an idempotency key already stored,
+    or used by an earlier bid of the list, for the same bidder. Keyed
+    retries racing the duplicate check of MemoryBidEngine.place_bid are
+    dropped this way when they are flushed.
+    """
+    keyed = [bid for bid in bids if bid.idempotency_key]
+    if not keyed:
+        return list(bids)
+    seen = set(
+        Bid.objects.filter(
+            bidder_id__in={bid.bidder_id for bid in keyed},
+            idempotency_key__in={bid.idempotency_key for bid in keyed},
+        ).values_list("bidder_id", "idempotency_key")
+    )
+    unstored = []
+    for bid in bids:
+        if bid.idempotency_key:
+            key = (bid.bidder_id, bid.idempotency_key)
+            if key in seen:
+                continue
+            seen.add(key)
+        unstored.append(bid)
+    return unstored
+
+
+class DatabaseBidEngine:
+    """Bid engine that decides every bid with a conditional update"""
+
+    def place_bid(self, auction_id, bidder, bid_amount, idempotency_key=None):
+        placed = place_bid(auction_id, bidder, bid_amount, idempotency_key)
+        publish_placed_bid(placed)
+        return placed
+
+    def snapshot(self, auction_id):
+        return auction_snapshot(auction_id)
+
+    def commit_bids(self, auction_id, expected_highest, bids):
+        placed = commit_bids(auction_id, expected_highest, bids)
+        if placed is not None:
+            publish_placed_bid(placed)
+        return placed
+
+    def update_book(self, product):
+        """Auction state is always read from the database"""
+
+    def flush(self):
+        """Nothing is buffered, every accepted bid is already stored"""
+
+
+class AuctionBook:
+    """In-process state of a single live auction"""
+
+    __slots__ = (
+        "auction_id",
+        "highest_bid",
+        "highest_bidder_id",
+        "bidding_step",
+        "starting_price",
+        "start_time",
+        "end_time",
+        "extended_end",
+        "is_closed",
+        "recent",
+        "lock",
+    )
+
+    def __init__(
+        self,
+        auction_id,
+        start_time,
+        end_time,
+        bidding_step,
+        starting_price,
+        is_closed,
+        recent_size,
+    ):
+        self.auction_id = auction_id
+        self.highest_bid = None
+        self.highest_bidder_id = None
+        self.bidding_step = bidding_step or Decimal("0")
+        self.starting_price = starting_price
+        self.start_time = start_time
+        self.end_time = end_time
+        # Latest end_time soft close moved the auction to
+        self.extended_end = None
+        self.is_closed = is_closed
+        self.recent = deque(maxlen=recent_size)
+        self.lock = threading.Lock()
+
+    def record(self, bid_time, bidder_id, bid_amount):
+        """Remember an accepted bid as the auction's highest"""
+        self.highest_bid = bid_amount
+        self.highest_bidder_id = bidder_id
+        self.recent.append((bid_time, bidder_id, bid_amount))
+
+    def snapshot(self):
+        return AuctionSnapshot(
+            self.highest_bid,
+            self.highest_bidder_id,
+            self.bidding_step,
+            self.starting_price,
+            self.start_time,
+            self.end_time,
+        )
+
+    def is_open(self, now):
+        return bool(
+            not self.is_closed
+            and self.start_time
+            and self.end_time
+            and self.start_time < now < self.end_time
+        )
+
+    def extension(self, now):
+        """End time a bid at now moves the auction to by the soft-close rule"""
+        extended_end = soft_close_end_time(now)
+        if extended_end is None or extended_end <= self.end_time:
+            return None
+        window = timedelta(seconds=settings.AUCTION_SOFT_CLOSE_WINDOW)
+        if self.end_time > now + window:
+            return None
+        return extended_end
+
+    def outbids(self, bid_amount):
+        return outbids(bid_amount, self.highest_bid, self.bidding_step)
+
+    def placed(self, bid, extended):
+        """PlacedBid of an accepted bid, end_time as the database engine has"""
+        end_time = None
+        if settings.AUCTION_SOFT_CLOSE_WINDOW:
+            end_time = self.end_time
+        return PlacedBid(bid, end_time, extended)
+
+
+class MemoryBidEngine:
+    """
+    Bid engine keeping live auctions in memory with write-behind persistence.
+
+    Bids are accepted or rejected against the in-process AuctionBook only;
+    accepted Bid rows are written in batches by a background thread. Soft
+    close extensions are stored right away, so that close_auctions never
+    closes an auction at the end_time it had before. The state lives in one
+    process, so this engine must only be enabled when a single worker
+    handles bidding.
+    """
+
+    def __init__(
+        self, flush_interval=1.0, flush_size=500, recent_size=50, max_retries=3
+    ):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.recent_size = recent_size
+        self.max_retries = max_retries
+        self._books = {}
+        self._books_lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._failures = 0
+        self._wakeup = threading.Event()
+        self._flusher = None
+
+    def load(self):
+        """Rebuild the books of all unfinished auctions from the Bid table"""
+        now = timezone.now()
+        auctions = Product.objects.filter(
+            end_time__gt=now, is_closed=False
+        ).values_list(
+            "id",
+            "start_time",
+            "end_time",
+            "bidding_step",
+            "starting_price",
+            "is_closed",
+        )
+        books = {
+            row[0]: AuctionBook(*row, recent_size=self.recent_size)
+            for row in auctions.iterator()
+        }
+
+        bids = (
+            Bid.objects.filter(auction__end_time__gt=now)
+            .order_by("auction_id", "bid_time", "id")
+            .values_list("auction_id", "bid_time", "bidder_id", "bid_amount")
+        )
+        for auction_id, bid_time, bidder_id, bid_amount in bids.iterator():
+            book = books.get(auction_id)
+            if book is None:
+                continue
+            book.recent.append((bid_time, bidder_id, bid_amount))
+            if book.highest_bid is None or bid_amount > book.highest_bid:
+                book.highest_bid = bid_amount
+                book.highest_bidder_id = bidder_id
+
+        with self._books_lock:
+            self._books = books
+
+    def start(self):
+        """Start the write-behind thread and flush on interpreter exit"""
+        self._flusher = threading.Thread(
+            target=self._run_flusher, name="bid-engine-flusher", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def get_book(self, auction_id):
+        """Return the book of an auction, loading it on first use"""
+        book = self._books.get(auction_id)
+        if book is not None:
+            return book
+
+        auction = (
+            Product.objects.filter(pk=auction_id)
+            .values(
+                "start_time",
+                "end_time",
+                "bidding_step",
+                "starting_price",
+                "is_closed",
+            )
+            .first()
+        )
+        if auction is None:
+            return None
+
+        book = AuctionBook(
+            auction_id,
+            auction["start_time"],
+            auction["end_time"],
+            auction["bidding_step"],
+            auction["starting_price"],
+            auction["is_closed"],
+            self.recent_size,
+        )
+        highest = (
+            Bid.objects.filter(auction_id=auction_id)
+            .order_by("-bid_amount", "bid_time")
+            .values_list("bidder_id", "bid_amount")
+            .first()
+        )
+        if highest:
+            book.highest_bidder_id, book.highest_bid = highest
+
+        with self._books_lock:
+            return self._books.setdefault(auction_id, book)
+
+    def update_book(self, product):
+        """
+        Refresh the window and step of a loaded auction after it is edited.
+        A soft-close extension past the edited end_time is kept, and stored
+        again in case the edit wrote back the end_time it had before.
+        """
+        book = self._books.get(product.id)
+        if book is None:
+            return
+        with book.lock:
+            book.start_time = product.start_time
+            book.end_time = product.end_time
+            book.bidding_step = product.bidding_step or Decimal("0")
+            book.starting_price = product.starting_price
+            book.is_closed = product.is_closed
+            extended_end = book.extended_end
+            if (
+                extended_end
+                and product.end_time
+                and extended_end > product.end_time
+            ):
+                if self._store_extension(book, extended_end):
+                    book.end_time = book.extended_end
+
+    def recent_bids(self, auction_id):
+        """Return the latest accepted bids of a loaded auction"""
+        book = self._books.get(auction_id)
+        if book is None:
+            return []
+        with book.lock:
+            return list(book.recent)
+
+    def place_bid(self, auction_id, bidder, bid_amount, idempotency_key=None):
+        book = self.get_book(auction_id)
+        if book is None:
+            raise BidRejected("Auction not found.", status.HTTP_404_NOT_FOUND)
+        duplicate = find_duplicate_bid(bidder, idempotency_key)
+        if duplicate is not None:
+            raise DuplicateBid(duplicate)
+
+        with book.lock:
+            now = timezone.now()
+            if not book.is_open(now):
+                raise BidRejected(AUCTION_NOT_OPEN)
+            if not book.outbids(bid_amount):
+                raise BidRejected(BID_TOO_LOW)
+            extended = self._extend(book, now)
+            if extended is None:
+                raise BidRejected(AUCTION_NOT_OPEN)
+
+            book.record(now, bidder.id, bid_amount)
+            bid = Bid(
+                auction_id=auction_id,
+                bidder=bidder,
+                bid_amount=bid_amount,
+                bid_time=now,
+                idempotency_key=idempotency_key,
+            )
+            placed = book.placed(bid, extended)
+            self._enqueue([bid], placed)
+
+        publish_placed_bid(placed)
+        return placed
+
+    def snapshot(self, auction_id):
+        book = self.get_book(auction_id)
+        if book is None:
+            return None
+        with book.lock:
+            return book.snapshot()
+
+    def commit_bids(self, auction_id, expected_highest, bids):
+        book = self.get_book(auction_id)
+        if book is None:
+            return None
+
+        with book.lock:
+            now = timezone.now()
+            if not book.is_open(now) or book.highest_bid != expected_highest:
+                return None
+            if not outbid_in_turn(
+                [bid.bid_amount for bid in bids],
+                book.highest_bid,
+                book.bidding_step,
+            ):
+                return None
+            extended = self._extend(book, now)
+            if extended is None:
+                return None
+            for bid in bids:
+                bid.bid_time = now
+                book.record(now, bid.bidder_id, bid.bid_amount)
+            placed = book.placed(bids[-1], extended)
+            self._enqueue(bids, placed)
+
+        publish_placed_bid(placed)
+        return placed
+
+    def _extend(self, book, now):
+        """
+        Apply the soft-close rule for a bid accepted at now, with the book
+        locked. Returns whether the auction was extended, None when it was
+        closed in the meantime and the bid must be rejected.
+        """
+        extended_end = book.extension(now)
+        if extended_end is None:
+            return False
+        if not self._store_extension(book, extended_end):
+            return None
+        book.end_time = book.extended_end = extended_end
+        return True
+
+    def _store_extension(self, book, end_time):
+        """Store the extended end_time of an auction unless it is closed"""
+        stored = Product.objects.filter(
+            pk=book.auction_id, is_closed=False
+        ).update(end_time=end_time)
+        if not stored:
+            book.is_closed = True
+        return bool(stored)
+
+    def _enqueue(self, bids, placed):
+        with self._pending_lock:
+            self._pending.extend(bids)
+            pending_count = len(self._pending)
+        if pending_count >= self.flush_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Write pending bids and the resulting auction counters in one
+        transaction. A failed batch is retried by the next flushes, after
+        max_retries failures its bids are written one at a time and the
+        ones still failing are logged and dropped.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+
+            try:
+                self._store(batch)
+            except Exception:
+                self._failures += 1
+                if self._failures < self.max_retries:
+                    logger.exception(
+                        "Failed to flush %d bids, will retry", len(batch)
+                    )
+                    with self._pending_lock:
+                        self._pending = batch + self._pending
+                    return
+                logger.exception(
+                    "Failed to flush %d bids %d times, "
+                    "storing them one at a time",
+                    len(batch),
+                    self._failures,
+                )
+                self._store_each(batch)
+            self._failures = 0
+
+    def _open_auction_bids(self, bids):
+        """
+        The given bids but those of auctions closed before they could be
+        stored, which are logged and dropped so that a closed auction and
+        its winner never change. The auctions stay locked until the flush
+        commits.
+        """
+        closed = set(
+            Product.objects.select_for_update()
+            .filter(id__in={bid.auction_id for bid in bids}, is_closed=True)
+            .values_list("id", flat=True)
+        )
+        if not closed:
+            return bids
+        for auction_id in closed:
+            book = self._books.get(auction_id)
+            if book is not None:
+                book.is_closed = True
+        late = [bid for bid in bids if bid.auction_id in closed]
+        for bid in late:
+            logger.error(
+                "Dropped bid of %s by user %s on auction %s at %s, "
+                "closed before it was stored",
+                bid.bid_amount,
+                bid.bidder_id,
+                bid.auction_id,
+                bid.bid_time.isoformat(),
+            )
+        metrics.incr("bid_engine.closed", len(late))
+        return [bid for bid in bids if bid.auction_id not in closed]
+
+    def _store(self, batch):
+        with transaction.atomic():
+            unstored = unstored_bids(batch)
+            bids = self._open_auction_bids(unstored)
+            Bid.objects.bulk_create(bids)
+            record_bids_in_rollups(bids)
+
+            counters = {}
+            for bid in bids:
+                bid_count = counters.get(bid.auction_id, (0,))[0]
+                counters[bid.auction_id] = (bid_count + 1, bid)
+            Product.objects.bulk_update(
+                [
+                    Product(
+                        id=auction_id,
+                        current_highest_bid=bid.bid_amount,
+                        bid_count=F("bid_count") + bid_count,
+                        highest_bidder_id=bid.bidder_id,
+                        last_bid_at=bid.bid_time,
+                    )
+                    for auction_id, (bid_count, bid) in counters.items()
+                ],
+                [
+                    "current_highest_bid",
+                    "bid_count",
+                    "highest_bidder",
+                    "last_bid_at",
+                ],
+            )
+        metrics.incr("bid_engine.stored", len(bids))
+        metrics.incr("bid_engine.duplicates", len(batch) - len(unstored))
+
+    def _store_each(self, batch):
+        for bid in batch:
+            try:
+                self._store([bid])
+            except Exception:
+                logger.exception(
+                    "Dropped bid of %s by user %s on auction %s at %s",
+                    bid.bid_amount,
+                    bid.bidder_id,
+                    bid.auction_id,
+                    bid.bid_time.isoformat(),
+                )
+                metrics.incr("bid_engine.dropped")
+
+    def _run_flusher(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_bid_engine():
+    """Return the bid engine selected by settings.BID_ENGINE"""
+    global _engine
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None:
+            if settings.BID_ENGINE == "memory":
+                engine = MemoryBidEngine(
+                    flush_interval=settings.BID_ENGINE_FLUSH_INTERVAL,
+                    flush_size=settings.BID_ENGINE_FLUSH_SIZE,
+                    recent_size=settings.BID_ENGINE_RECENT_BIDS,
+                    max_retries=settings.BID_ENGINE_FLUSH_RETRIES,
+                )
+                engine.load()
+                engine.start()
+            else:
+                engine = DatabaseBidEngine()
+            _engine = engine
+    return _engine
+
+
+def bid_settle_time():
+    """
+    How long after it is accepted a bid may still wait to be stored: the
+    flushes the memory engine tries before storing bids one at a time, and
+    one more interval for the flush it waits for. Nothing with the database
+    engine, which stores a bid before accepting it.
+    """
+    if settings.BID_ENGINE != "memory":
+        return timedelta(0)
+    return timedelta(
+        seconds=settings.BID_ENGINE_FLUSH_INTERVAL
+        * (settings.BID_ENGINE_FLUSH_RETRIES + 1)
+    )
+
+
+def update_auction_book(product):
+    """
+    Refresh the bid engine's book of an edited auction. Nothing to do before
+    the engine is built, it reads the auction from the database then.
+    """
+    if _engine is not None:
+        _engine.update_book(product)
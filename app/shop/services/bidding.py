@@ -0,0 +1,324 @@
+from collections import namedtuple
+from datetime import timedelta
+from decimal import ROUND_FLOOR, Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import (Case, DecimalField, ExpressionWrapper, F, Q,
+                              Value, When)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import status
+
+from shop.models import Bid, Product
+from shop.services.auction_rollups import record_bids_in_rollups
+
+
+AuctionSnapshot = namedtuple(
+    "AuctionSnapshot",
+    [
+        "highest_bid",
+        "highest_bidder_id",
+        "bidding_step",
+        "starting_price",
+        "start_time",
+        "end_time",
+    ],
+)
+
+# end_time is None when soft close is disabled, bids never move it then
+PlacedBid = namedtuple("PlacedBid", ["bid", "end_time", "extended"])
+
+# Bid amounts are stored with two decimal places
+BID_PRECISION = Decimal("0.01")
+
+# Details of the bids rejected by the bidding rules
+AUCTION_NOT_OPEN = "Bid can only be placed within the specified time frame."
+BID_TOO_LOW = "Bid amount must be greater than the current highest bid amount"
+
+
+class BidRejected(Exception):
+    """Raised when a bid cannot be accepted for an auction"""
+
+    def __init__(self, detail, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class DuplicateBid(Exception):
+    """Raised when a bidder reuses the idempotency key of a stored bid"""
+
+    def __init__(self, bid):
+        super().__init__(bid.idempotency_key)
+        self.bid = bid
+
+
+def find_duplicate_bid(bidder, idempotency_key):
+    """Return the stored bid of a bidder carrying the given idempotency key"""
+    if idempotency_key is None:
+        return None
+    return Bid.objects.filter(
+        bidder=bidder, idempotency_key=idempotency_key
+    ).first()
+
+
+def open_auction_filter(now):
+    """Filter matching auctions that currently accept bids"""
+    return Q(start_time__lt=now, end_time__gt=now, is_closed=False)
+
+
+def outbids(bid_amount, highest_bid, bidding_step):
+    """
+    Whether an amount outbids the highest bid of an auction, which takes
+    more than one bidding step above it. Any amount opens the bidding.
+    """
+    lowest = lowest_outbid(highest_bid, bidding_step)
+    return lowest is None or bid_amount >= lowest
+
+
+def lowest_outbid(highest_bid, bidding_step):
+    """Lowest amount outbidding the highest bid, None when any amount does"""
+    if not highest_bid:
+        return None
+    return highest_bid + (bidding_step or 0) + BID_PRECISION
+
+
+def outbid_in_turn(amounts, highest_bid, bidding_step):
+    """Whether each amount outbids the one before, the first the highest bid"""
+    for amount in amounts:
+        if not outbids(amount, highest_bid, bidding_step):
+            return False
+        highest_bid = amount
+    return True
+
+
+def outbid_limit(bid_amount):
+    """
+    Bound the highest bid plus one step must stay below for bid_amount to
+    outbid it, the same rule as outbids. Half a cent of slack keeps the
+    comparison right on databases computing with floats, like SQLite.
+    """
+    floor = bid_amount.quantize(BID_PRECISION, rounding=ROUND_FLOOR)
+    return floor - BID_PRECISION / 2
+
+
+def outbids_filter(bid_amount):
+    """Filter matching auctions the given amount outbids, see outbids"""
+    maximum = ExpressionWrapper(
+        Value(outbid_limit(bid_amount))
+        - Coalesce(F("bidding_step"), Value(Decimal("0"))),
+        output_field=DecimalField(max_digits=10, decimal_places=3),
+    )
+    return (
+        Q(current_highest_bid__isnull=True)
+        | Q(current_highest_bid=0)
+        | Q(current_highest_bid__lt=maximum)
+    )
+
+
+def outbid_in_turn_filter(amounts):
+    """Filter matching auctions where each amount outbids the one before it"""
+    if len(amounts) < 2:
+        return Q()
+    smallest = min(
+        outbid_limit(amount) - previous
+        for previous, amount in zip(amounts, amounts[1:])
+    )
+    if smallest <= 0:
+        return Q(pk__in=[])
+    return Q(bidding_step__isnull=True) | Q(bidding_step__lt=smallest)
+
+
+def soft_close_end_time(now):
+    """
+    End time given to auctions receiving a bid in their soft-close window.
+
+    A bid placed within AUCTION_SOFT_CLOSE_WINDOW seconds of end_time pushes
+    end_time to AUCTION_SOFT_CLOSE_EXTENSION seconds after the bid. Returns
+    None when soft close is disabled.
+    """
+    if not settings.AUCTION_SOFT_CLOSE_WINDOW:
+        return None
+    return now + timedelta(seconds=settings.AUCTION_SOFT_CLOSE_EXTENSION)
+
+
+def soft_close_update(now, extended_end):
+    """UPDATE assignments extending end_time for a bid placed at now"""
+    if extended_end is None:
+        return {}
+    window = timedelta(seconds=settings.AUCTION_SOFT_CLOSE_WINDOW)
+    return {
+        "end_time": Case(
+            When(
+                end_time__lte=now + window,
+                end_time__lt=extended_end,
+                then=Value(extended_end),
+            ),
+            default=F("end_time"),
+        )
+    }
+
+
+def counters_update(bidder_id, bid_count, now):
+    """UPDATE assignments recording accepted bids on the auction row"""
+    return {
+        "bid_count": F("bid_count") + bid_count,
+        "highest_bidder_id": bidder_id,
+        "last_bid_at": now,
+    }
+
+
+def placed_bid(bid, extended_end):
+    """
+    PlacedBid of a bid just stored by a conditional update. The end_time
+    it left is read back while the update still locks the auction row,
+    unless soft close is disabled.
+    """
+    if extended_end is None:
+        return PlacedBid(bid, None, False)
+    end_time = Product.objects.values_list("end_time", flat=True).get(
+        pk=bid.auction_id
+    )
+    return PlacedBid(bid, end_time, end_time == extended_end)
+
+
+def explain_rejection(auction_id, now):
+    """Work out why the conditional update did not match the auction"""
+    auction = (
+        Product.objects.filter(pk=auction_id)
+        .values("start_time", "end_time")
+        .first()
+    )
+    if auction is None:
+        return BidRejected("Auction not found.", status.HTTP_404_NOT_FOUND)
+
+    start_time = auction["start_time"]
+    end_time = auction["end_time"]
+    if not (start_time and end_time and start_time < now < end_time):
+        return BidRejected(AUCTION_NOT_OPEN)
+
+    return BidRejected(BID_TOO_LOW)
+
+
+def place_bid(auction_id, bidder, bid_amount, idempotency_key=None):
+    """
+    Accept a bid with a single compare-and-set on the auction row.
+
+    The conditional UPDATE checks the bidding window and the bidding step
+    against the stored highest bid, so concurrent bidders can never overwrite
+    a higher amount. The same statement applies the soft-close extension and
+    bumps the auction's bid counters. The Bid row is inserted in the same
+    transaction while the auction row is still locked, which keeps bid ids
+    in price order. The bid is stamped with the time the update checked
+    the window against, so an extended end_time is always a full extension
+    after it.
+
+    A retried request reusing the idempotency key of a stored bid raises
+    DuplicateBid, whether it is rejected by the bidding rules or fails on
+    the unique constraint, which also rolls back its update.
+    """
+    now = timezone.now()
+    extended_end = soft_close_end_time(now)
+
+    try:
+        with transaction.atomic():
+            updated = (
+                Product.objects.filter(pk=auction_id)
+                .filter(open_auction_filter(now))
+                .filter(outbids_filter(bid_amount))
+                .update(
+                    current_highest_bid=bid_amount,
+                    **counters_update(bidder.id, 1, now),
+                    **soft_close_update(now, extended_end),
+                )
+            )
+            if updated:
+                bid = Bid.objects.create(
+                    auction_id=auction_id,
+                    bidder=bidder,
+                    bid_amount=bid_amount,
+                    bid_time=now,
+                    idempotency_key=idempotency_key,
+                )
+                record_bids_in_rollups([bid])
+                return placed_bid(bid, extended_end)
+    except IntegrityError:
+        duplicate = find_duplicate_bid(bidder, idempotency_key)
+        if duplicate is None:
+            raise
+        raise DuplicateBid(duplicate)
+
+    # A retry usually no longer outbids its own stored original
+    duplicate = find_duplicate_bid(bidder, idempotency_key)
+    if duplicate is not None:
+        raise DuplicateBid(duplicate)
+    raise explain_rejection(auction_id, now)
+
+
+def auction_snapshot(auction_id):
+    """Read the bidding state of an auction, None if it does not exist"""
+    auction = (
+        Product.objects.filter(pk=auction_id)
+        .values(
+            "current_highest_bid",
+            "highest_bidder_id",
+            "bidding_step",
+            "starting_price",
+            "start_time",
+            "end_time",
+        )
+        .first()
+    )
+    if auction is None:
+        return None
+
+    return AuctionSnapshot(
+        auction["current_highest_bid"],
+        auction["highest_bidder_id"],
+        auction["bidding_step"] or Decimal("0"),
+        auction["starting_price"],
+        auction["start_time"],
+        auction["end_time"],
+    )
+
+
+def commit_bids(auction_id, expected_highest, bids):
+    """
+    Store bids decided outside the request path, such as proxy bids.
+
+    The auction's highest bid is only moved from expected_highest to the
+    last of the given bids, so a concurrent bid makes the commit fail and
+    the caller decide again. Each bid must outbid the one before it like
+    a bid placed by hand. All bids are written with one bulk insert.
+    Returns a PlacedBid for the last bid, or None when the commit failed.
+    """
+    now = timezone.now()
+    extended_end = soft_close_end_time(now)
+    amounts = [bid.bid_amount for bid in bids]
+    auctions = (
+        Product.objects.filter(pk=auction_id)
+        .filter(open_auction_filter(now))
+        .filter(outbids_filter(amounts[0]))
+        .filter(outbid_in_turn_filter(amounts))
+    )
+    if expected_highest:
+        auctions = auctions.filter(current_highest_bid=expected_highest)
+    else:
+        auctions = auctions.filter(
+            Q(current_highest_bid__isnull=True) | Q(current_highest_bid=0)
+        )
+
+    with transaction.atomic():
+        updated = auctions.update(
+            current_highest_bid=bids[-1].bid_amount,
+            **counters_update(bids[-1].bidder_id, len(bids), now),
+            **soft_close_update(now, extended_end),
+        )
+        if not updated:
+            return None
+        for bid in bids:
+            bid.bid_time = now
+        Bid.objects.bulk_create(bids)
+        record_bids_in_rollups(bids)
+        return placed_bid(bids[-1], extended_end)
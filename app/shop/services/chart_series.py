@@ -0,0 +1,133 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db import connection
+from django.db.models import CharField, Count, Sum
+from django.db.models.functions import Substr, TruncHour
+from django.utils import timezone
+
+from shop.models import AuctionDailyStats, Bid, UserStats
+
+CHART_GRANULARITIES = ("hour", "day", "week", "month")
+
+# Metric: (raw model, its timestamp field, rollup column)
+CHART_METRICS = {
+    "bids": (Bid, "bid_time", "bid_count"),
+    "views": (UserStats, "view_timestamp", "view_count"),
+}
+
+# numpy unit of the buckets and of their labels per granularity
+BUCKET_UNITS = {"hour": "h", "day": "D", "week": "D", "month": "M"}
+LABEL_UNITS = {"hour": "m", "day": "D", "week": "D", "month": "M"}
+
+
+def bucket_starts(moments, granularity):
+    """Start of the bucket each datetime64 moment falls in"""
+    buckets = moments.astype(f"datetime64[{BUCKET_UNITS[granularity]}]")
+    if granularity == "week":
+        # Weeks start on Monday, day 0 of numpy's calendar is a Thursday
+        buckets = buckets - (buckets.astype(np.int64) + 3) % 7
+    return buckets
+
+
+def dense_series(moments, counts, start, end, granularity):
+    """
+    Sum counts into every bucket from start to end, empty buckets included.
+
+    moments and counts are the grouped query rows as arrays, start and end
+    the first and last day of the range. Buckets on the edges of the range
+    may extend past it for weeks and months.
+    """
+    range_hours = np.array(
+        [start, end + timedelta(days=1)], dtype="datetime64[h]"
+    )
+    range_hours[1] -= 1
+    first, last = bucket_starts(range_hours, granularity)
+    step = 7 if granularity == "week" else 1
+    buckets = np.arange(first, last + step, step)
+    starts = bucket_starts(moments, granularity)
+    slots = np.searchsorted(buckets, starts, side="right") - 1
+    totals = np.bincount(slots, weights=counts, minlength=len(buckets))
+    label_unit = LABEL_UNITS[granularity]
+    labels = np.datetime_as_string(buckets.astype(f"datetime64[{label_unit}]"))
+    return labels.tolist(), totals.astype(np.int64).tolist()
+
+
+def grouped_counts(seller_id, metric, start, end, granularity):
+    """
+    (moments, counts) arrays of the seller's metric grouped at the finest
+    level needed
+    """
+    model, timestamp_field, rollup_field = CHART_METRICS[metric]
+    if granularity != "hour":
+        # Daily rollups are enough for days and anything coarser
+        rows = (
+            AuctionDailyStats.objects.filter(
+                seller_id=seller_id, day__range=(start, end)
+            )
+            .values("day")
+            .annotate(total=Sum(rollup_field))
+            .values_list("day", "total")
+            .order_by()
+        )
+        days, totals = zip(*rows) if rows else ((), ())
+        return (
+            np.array(days, dtype="datetime64[D]"),
+            np.array(totals, dtype=np.int64),
+        )
+
+    tz = timezone.get_current_timezone()
+    since = timezone.make_aware(datetime.combine(start, time.min), tz)
+    until = timezone.make_aware(
+        datetime.combine(end + timedelta(days=1), time.min), tz
+    )
+    events = model.objects.filter(
+        auction__user_id=seller_id,
+        **{f"{timestamp_field}__gte": since, f"{timestamp_field}__lt": until},
+    )
+    if (
+        connection.vendor == "sqlite"
+        and timezone.get_current_timezone_name() == "UTC"
+    ):
+        # SQLite truncates dates with a Python function called per row, while
+        # its UTC "YYYY-MM-DD HH:MM:SS" text only needs cutting after the hour
+        hour = Substr(timestamp_field, 1, 13, output_field=CharField())
+    else:
+        hour = TruncHour(timestamp_field)
+    rows = (
+        events.annotate(hour=hour)
+        .values("hour")
+        .annotate(total=Count("id"))
+        .values_list("hour", "total")
+        .order_by()
+    )
+    hours, totals = zip(*rows) if rows else ((), ())
+    if hours and isinstance(hours[0], datetime):
+        # Hours come back aware in the current time zone, buckets are local
+        hours = [
+            timezone.localtime(hour, tz).replace(tzinfo=None) for hour in hours
+        ]
+    return (
+        np.array(hours, dtype="datetime64[h]"),
+        np.array(totals, dtype=np.int64),
+    )
+
+
+def chart_series(seller_id, metric, start, end, granularity="day"):
+    """
+    Dense bid or view counts of a seller's auctions from start to end.
+
+    Returns bucket labels (ISO, local time) and their counts as parallel
+    lists, with zero for buckets without activity.
+    """
+    moments, counts = grouped_counts(
+        seller_id, metric, start, end, granularity
+    )
+    buckets, counts = dense_series(moments, counts, start, end, granularity)
+    return {
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "buckets": buckets,
+        "counts": counts,
+    }
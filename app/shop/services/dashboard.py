@@ -0,0 +1,56 @@
+from django.db.models import Max, Sum
+
+from shop.models import AuctionDailyStats
+from shop.services.analytics_cache import cached_analytics
+from shop.services.viewer_sketches import estimate_unique_viewers
+
+
+def seller_dashboard(seller_id, start, end):
+    """
+    Bid and view totals and per-day series of a seller from start to end,
+    both included, computed with one grouped query over the daily rollups
+    plus one merging their viewer sketches, and cached until the seller's
+    next bid or view.
+    """
+    return cached_analytics(
+        "dashboard",
+        seller_id,
+        (start, end),
+        lambda: compute_dashboard(seller_id, start, end),
+    )
+
+
+def compute_dashboard(seller_id, start, end):
+    rollups = AuctionDailyStats.objects.filter(
+        seller_id=seller_id, day__range=(start, end)
+    )
+    days = (
+        rollups.values("day")
+        .annotate(
+            bids=Sum("bid_count"),
+            views=Sum("view_count"),
+            unique_viewers=Sum("unique_viewers"),
+            max_bid=Max("max_bid"),
+        )
+        .order_by("day")
+    )
+    series = list(days)
+    return {
+        "start": start,
+        "end": end,
+        "totals": {
+            "bids": sum(day["bids"] for day in series),
+            "views": sum(day["views"] for day in series),
+            # Viewers of several auctions count once, unlike in the series
+            "unique_viewers": estimate_unique_viewers(rollups),
+            "max_bid": max(
+                (
+                    day["max_bid"]
+                    for day in series
+                    if day["max_bid"] is not None
+                ),
+                default=None,
+            ),
+        },
+        "series": series,
+    }
@@ -0,0 +1,175 @@
+import csv
+import io
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from shop.models import Bid, UserStats
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_FORMATS = ("csv", "parquet")
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Kind: (model, timestamp field, exported columns)
+EXPORT_KINDS = {
+    "bids": (
+        Bid,
+        "bid_time",
+        ("id", "auction_id", "bidder_id", "bid_amount", "bid_time"),
+    ),
+    "views": (
+        UserStats,
+        "view_timestamp",
+        ("id", "auction_id", "user_id", "view_timestamp"),
+    ),
+}
+
+
+class ExportUnavailable(Exception):
+    """The requested export format needs a library that is not installed"""
+
+
+def export_available(file_format):
+    return file_format == "csv" or pyarrow is not None
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def history_rows(seller_id, kind, start=None, end=None, chunk_size=2000):
+    """
+    Lazily read the seller's bid or view rows from the start to the end
+    day, both included, as tuples in id order.
+
+    Rows are fetched chunk_size at a time, with a server-side cursor where
+    the database supports it, so memory does not grow with the history.
+    """
+    model, timestamp_field, columns = EXPORT_KINDS[kind]
+    rows = model.objects.filter(auction__user_id=seller_id)
+    if start is not None:
+        rows = rows.filter(**{f"{timestamp_field}__gte": day_start(start)})
+    if end is not None:
+        until = day_start(end + timedelta(days=1))
+        rows = rows.filter(**{f"{timestamp_field}__lt": until})
+    return (
+        rows.order_by("id")
+        .values_list(*columns)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def csv_chunks(kind, rows, rows_per_chunk=1000):
+    """Encode rows as CSV with a header, yielding bytes every rows_per_chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_KINDS[kind][2])
+    written = 0
+    for row in rows:
+        writer.writerow(row)
+        written += 1
+        if written % rows_per_chunk == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file collecting bytes until they are taken out"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_schema(kind):
+    timestamp = pyarrow.timestamp("us", tz="UTC")
+    if kind == "bids":
+        return pyarrow.schema(
+            [
+                ("id", pyarrow.int64()),
+                ("auction_id", pyarrow.int64()),
+                ("bidder_id", pyarrow.int64()),
+                ("bid_amount", pyarrow.decimal128(10, 2)),
+                ("bid_time", timestamp),
+            ]
+        )
+    return pyarrow.schema(
+        [
+            ("id", pyarrow.int64()),
+            ("auction_id", pyarrow.int64()),
+            ("user_id", pyarrow.int64()),
+            ("view_timestamp", timestamp),
+        ]
+    )
+
+
+def parquet_chunks(kind, rows, rows_per_group=65536):
+    """
+    Encode rows as a Parquet file, one row group of rows_per_group rows at
+    a time, yielding the bytes of each group as soon as it is written.
+    """
+    schema = parquet_schema(kind)
+    sink = ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="snappy")
+
+    def write_group(group):
+        columns = list(zip(*group))
+        writer.write_batch(
+            pyarrow.record_batch(
+                [
+                    pyarrow.array(column, type=field.type)
+                    for column, field in zip(columns, schema)
+                ],
+                schema=schema,
+            )
+        )
+
+    group = []
+    for row in rows:
+        group.append(row)
+        if len(group) == rows_per_group:
+            write_group(group)
+            group = []
+            yield sink.take()
+    if group:
+        write_group(group)
+    writer.close()
+    yield sink.take()
+
+
+def export_history(seller_id, kind, file_format="csv", start=None, end=None):
+    """Bytes chunks of the seller's bid or view history in the given format"""
+    if not export_available(file_format):
+        raise ExportUnavailable(
+            f"{file_format} exports need pyarrow installed."
+        )
+    rows = history_rows(seller_id, kind, start, end)
+    if file_format == "parquet":
+        return parquet_chunks(kind, rows)
+    return csv_chunks(kind, rows)
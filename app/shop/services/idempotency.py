@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+
+from core.metrics import metrics
+
+StoredResponse = namedtuple("StoredResponse", ["status_code", "data"])
+
+
+class IdempotencyCache:
+    """
+    Bounded LRU of responses keyed by (user id, Idempotency-Key).
+
+    Entries expire ttl seconds after they were stored, and the least
+    recently used entry is evicted once max_size is reached. Lookups count
+    hits and misses under the given metrics prefix.
+    """
+
+    def __init__(self, max_size, ttl, name):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            metrics.incr(f"{self.name}.misses")
+            return None
+        metrics.incr(f"{self.name}.hits")
+        return entry[1]
+
+    def put(self, key, status_code, data):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires, StoredResponse(status_code, data))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+bid_responses = IdempotencyCache(
+    settings.BID_IDEMPOTENCY_CACHE_SIZE,
+    settings.BID_IDEMPOTENCY_TTL,
+    "bid_idempotency",
+)
@@ -0,0 +1,79 @@
+import numpy as np
+
+from shop.models import Bid, Product
+from shop.services.analytics_cache import cached_answer
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The points in between are
+    split into threshold - 2 buckets, and each bucket keeps the point
+    forming the largest triangle with the point kept before it and the
+    average of the next bucket. x must be sorted.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    bounds = np.append(edges, n)
+    # Averages of every bucket, the last point counting as one more bucket
+    sizes = np.diff(bounds)
+    mean_x = np.add.reduceat(x, bounds[:-1]) / sizes
+    mean_y = np.add.reduceat(y, bounds[:-1]) / sizes
+
+    kept = np.empty(threshold, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_x, next_y = mean_x[bucket + 1], mean_y[bucket + 1]
+        px, py = x[previous], y[previous]
+        areas = np.abs(
+            (px - next_x) * (y[start:stop] - py)
+            - (px - x[start:stop]) * (next_y - py)
+        )
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def compute_price_history(auction_id, points):
+    bids = list(
+        Bid.objects.filter(auction_id=auction_id)
+        .order_by("bid_time", "id")
+        .values_list("bid_time", "bid_amount")
+    )
+    if not bids:
+        return {"auction": auction_id, "bids": 0, "points": []}
+    times, amounts = zip(*bids)
+    x = np.array([time.timestamp() for time in times], dtype=np.float64)
+    y = np.array(amounts, dtype=np.float64)
+    kept = lttb(x - x[0], y, points)
+    return {
+        "auction": auction_id,
+        "bids": len(bids),
+        "points": [(times[index], amounts[index]) for index in kept.tolist()],
+    }
+
+
+def price_history(auction_id, points=500):
+    """
+    (time, amount) points of an auction's bids, downsampled with LTTB to at
+    most the given number of points. None if the auction does not exist.
+    Cached until the auction's next bid, which changes its bid count.
+    """
+    bid_count = (
+        Product.objects.filter(pk=auction_id)
+        .values_list("bid_count", flat=True)
+        .first()
+    )
+    if bid_count is None:
+        return None
+    return cached_answer(
+        "price_history",
+        (auction_id, bid_count, points),
+        lambda: compute_price_history(auction_id, points),
+    )
@@ -0,0 +1,304 @@
+import threading
+import uuid
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from shop.models import Product, ProductAttributeValues
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+CHUNK_MASK = CHUNK_SIZE - 1
+
+# Key of the bitmap holding every indexed product
+ALL_PRODUCTS = ("all",)
+
+INDEX_VERSION_KEY = "shop:product-index-version"
+
+try:
+    popcount = int.bit_count
+except AttributeError:
+    # Python < 3.10
+    def popcount(value):
+        return bin(value).count("1")
+
+
+class Bitmap:
+    """
+    Set of product ids stored as one integer bitmap per range of 65536
+    ids, keyed by the high bits of the ids. Ranges without members take
+    no space, set operations only touch the ranges both sides have.
+    """
+
+    __slots__ = ("chunks",)
+
+    def __init__(self, chunks=None):
+        self.chunks = chunks if chunks is not None else {}
+
+    def add(self, value):
+        high = value >> CHUNK_BITS
+        bit = 1 << (value & CHUNK_MASK)
+        self.chunks[high] = self.chunks.get(high, 0) | bit
+
+    def discard(self, value):
+        high = value >> CHUNK_BITS
+        chunk = self.chunks.get(high, 0) & ~(1 << (value & CHUNK_MASK))
+        if chunk:
+            self.chunks[high] = chunk
+        else:
+            self.chunks.pop(high, None)
+
+    def __and__(self, other):
+        chunks = {}
+        for high, chunk in self.chunks.items():
+            both = chunk & other.chunks.get(high, 0)
+            if both:
+                chunks[high] = both
+        return Bitmap(chunks)
+
+    def __or__(self, other):
+        chunks = dict(self.chunks)
+        for high, chunk in other.chunks.items():
+            chunks[high] = chunks.get(high, 0) | chunk
+        return Bitmap(chunks)
+
+    def __len__(self):
+        return sum(popcount(chunk) for chunk in self.chunks.values())
+
+    def intersection_size(self, other):
+        """Members shared with another bitmap, without intersecting them"""
+        return sum(
+            popcount(chunk & other.chunks.get(high, 0))
+            for high, chunk in self.chunks.items()
+        )
+
+    def to_array(self):
+        """Members in increasing order as a numpy array"""
+        parts = []
+        for high in sorted(self.chunks):
+            data = self.chunks[high].to_bytes(CHUNK_SIZE // 8, "little")
+            bits = np.unpackbits(
+                np.frombuffer(data, dtype=np.uint8), bitorder="little"
+            )
+            parts.append(np.flatnonzero(bits) + (high << CHUNK_BITS))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+
+def searchable_products():
+    """Products product search may return"""
+    return Product.objects.filter(
+        is_active=True, status=True, user__is_active=True
+    )
+
+
+def index_entries(products):
+    """{product id: (index keys, priority)} of a queryset of products"""
+    entries = {}
+    rows = products.values_list("id", "user_id", "region", "city", "priority")
+    for product_id, user_id, region, city, priority in rows.iterator():
+        keys = {ALL_PRODUCTS, ("user", user_id)}
+        if region:
+            keys.add(("region", region.lower()))
+        if city:
+            keys.add(("city", city.lower()))
+        entries[product_id] = (keys, priority)
+
+    product_ids = products.values("id")
+    categories = Product.category.through.objects.filter(
+        product__in=product_ids
+    )
+    values = ProductAttributeValues.objects.filter(product__in=product_ids)
+    for kind, links in (
+        ("category", categories.values_list("product_id", "category_id")),
+        ("value", values.values_list("product_id", "attributevalues_id")),
+    ):
+        for product_id, key_id in links.iterator():
+            if product_id in entries:
+                entries[product_id][0].add((kind, key_id))
+    return entries
+
+
+class ProductIndex:
+    """
+    In-process inverted index of the searchable products.
+
+    Maps every attribute value, category, seller, region and city to the
+    Bitmap of the products having it, so that product search filters are
+    bitmap intersections and facet counts popcounts. Changed products are
+    re-read from the database, see refresh_indexed_products.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._bitmaps = {}
+        self._keys = {}
+        self._priorities = {}
+        self._lock = threading.Lock()
+
+    def load(self, version=None):
+        """Build the index from all the searchable products"""
+        bitmaps = {}
+        keys = {}
+        priorities = {}
+        entries = index_entries(searchable_products())
+        for product_id, (product_keys, priority) in entries.items():
+            for key in product_keys:
+                bitmaps.setdefault(key, Bitmap()).add(product_id)
+            keys[product_id] = product_keys
+            priorities[product_id] = priority
+        with self._lock:
+            self._bitmaps = bitmaps
+            self._keys = keys
+            self._priorities = priorities
+            self.version = version
+
+    def refresh(self, product_ids, batch_size=500):
+        """Re-read products, dropping those deleted or no longer searchable"""
+        product_ids = list(product_ids)
+        for start in range(0, len(product_ids), batch_size):
+            batch = product_ids[start:start + batch_size]
+            entries = index_entries(searchable_products().filter(id__in=batch))
+            with self._lock:
+                for product_id in batch:
+                    for key in self._keys.pop(product_id, ()):
+                        bitmap = self._bitmaps[key]
+                        bitmap.discard(product_id)
+                        if not bitmap.chunks:
+                            del self._bitmaps[key]
+                    self._priorities.pop(product_id, None)
+                    if product_id in entries:
+                        product_keys, priority = entries[product_id]
+                        for key in product_keys:
+                            bitmap = self._bitmaps.setdefault(key, Bitmap())
+                            bitmap.add(product_id)
+                        self._keys[product_id] = product_keys
+                        self._priorities[product_id] = priority
+
+    def _get(self, key):
+        return Bitmap(dict(self._bitmaps.get(key, Bitmap()).chunks))
+
+    def _any_of(self, keys):
+        union = Bitmap()
+        for key in keys:
+            union = union | self._bitmaps.get(key, Bitmap())
+        return union
+
+    def search(
+        self, categories=None, seller=None, region=None, city=None, selected=()
+    ):
+        """
+        Bitmap of the products matching every given filter. categories is
+        an iterable of category ids and each entry of selected a list of
+        attribute value ids, a product matches either by having any of them.
+        """
+        with self._lock:
+            matches = self._get(ALL_PRODUCTS)
+            if categories is not None:
+                matches = matches & self._any_of(
+                    ("category", category) for category in categories
+                )
+            if seller is not None:
+                matches = matches & self._get(("user", seller))
+            if region:
+                matches = matches & self._get(("region", region.lower()))
+            if city:
+                matches = matches & self._get(("city", city.lower()))
+            for values in selected:
+                matches = matches & self._any_of(
+                    ("value", int(value)) for value in values
+                )
+        return matches
+
+    def value_counts(self, matches):
+        """
+        {attribute value id: matching products having it}, for the values
+        some matching product has
+        """
+        counts = {}
+        with self._lock:
+            for key, bitmap in self._bitmaps.items():
+                if key[0] == "value":
+                    count = matches.intersection_size(bitmap)
+                    if count:
+                        counts[key[1]] = count
+        return counts
+
+    def ordered_ids(self, matches, recent=False):
+        """Ids of the matching products, newest or highest priority first"""
+        ids = matches.to_array()
+        if recent:
+            return ids[::-1].tolist()
+        with self._lock:
+            priorities = np.array(
+                [
+                    self._priorities.get(product_id, 0)
+                    for product_id in ids.tolist()
+                ]
+            )
+        return ids[np.argsort(-priorities, kind="stable")].tolist()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def product_index_version():
+    """
+    Version of the searchable products, shared by the workers through the
+    cache and replaced by reload_product_index. Versions are random so an
+    evicted version only costs a rebuild.
+    """
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(INDEX_VERSION_KEY, version, None):
+            version = cache.get(INDEX_VERSION_KEY, version)
+    return version
+
+
+def get_product_index():
+    """
+    Return the product index, built on first use and rebuilt once its
+    version was replaced, None unless settings.PRODUCT_INDEX
+    """
+    global _index
+    if not settings.PRODUCT_INDEX:
+        return None
+    # Read before loading, a reload asked for meanwhile is not missed
+    version = product_index_version()
+    if _index is not None and _index.version == version:
+        return _index
+
+    with _index_lock:
+        if _index is None:
+            index = ProductIndex()
+            index.load(version)
+            _index = index
+        elif _index.version != version:
+            _index.load(version)
+    return _index
+
+
+def refresh_indexed_products(product_ids):
+    """
+    Re-read the given products into the index once the current transaction
+    commits. Nothing to do before the index is built, it will read them then.
+    """
+    if _index is None:
+        return
+    product_ids = list(product_ids)
+    transaction.on_commit(lambda: _index.refresh(product_ids))
+
+
+def reload_product_index():
+    """
+    Make every worker rebuild its whole index on its next search, once the
+    current transaction commits. Needed after changes saved without
+    signals, like bulk_create() or raw SQL, see the rebuild_search_index
+    command. Workers only see it through a cache they share.
+    """
+    transaction.on_commit(
+        lambda: cache.set(INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+    )
@@ -0,0 +1,163 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, Q
+
+from shop.models import Product, ProductSearchDocument
+
+FTS_TABLE = ProductSearchDocument._meta.db_table
+MAX_SEARCH_TERMS = 10
+
+SEARCH_TERM = re.compile(r"(\w+)(\*?)")
+
+
+def search_terms(keywords):
+    """
+    (word, is prefix) pairs of the first words of a search. A word is a
+    prefix when it ends with * or is the last one, as it may not be typed
+    completely yet.
+    """
+    terms = SEARCH_TERM.findall(keywords.lower())[:MAX_SEARCH_TERMS]
+    return [
+        (word, bool(star) or position == len(terms) - 1)
+        for position, (word, star) in enumerate(terms)
+    ]
+
+
+def ordered_by_rank(queryset, rank, descending=False):
+    """Order by rank first, keeping the queryset's own ordering for ties"""
+    ordering = queryset.query.order_by or Product._meta.ordering
+    return queryset.annotate(search_rank=rank).order_by(
+        "-search_rank" if descending else "search_rank", *ordering
+    )
+
+
+class FTS5SearchBackend:
+    """
+    Search over a SQLite FTS5 index of product names and descriptions,
+    ranked by bm25 with names weighing ten times more. Matches are joined
+    to the products through ProductSearchDocument. The index keeps its own
+    copy of the text, updated as products are saved and deleted.
+    """
+
+    def search(self, queryset, keywords):
+        terms = search_terms(keywords)
+        if not terms:
+            return queryset.none()
+        query = " ".join(
+            f'"{word}"*' if prefix else f'"{word}"' for word, prefix in terms
+        )
+        return ordered_by_rank(
+            queryset.filter(search_document__document__match=query),
+            F("search_document__rank"),
+        )
+
+    def index_products(self, products):
+        rows = [
+            (product.id, product.name, product.description)
+            for product in products
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [row[:1] for row in rows],
+            )
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description)"
+                f" VALUES (%s, %s, %s)",
+                rows,
+            )
+
+    def remove_products(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [(product_id,) for product_id in product_ids],
+            )
+
+    def rebuild(self):
+        """Re-index every product, merging the index into a single segment"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description)"
+                f" SELECT id, name, description FROM shop_product"
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+            )
+
+
+class PostgresSearchBackend:
+    """Search with PostgreSQL text search vectors, ranked by ts_rank"""
+
+    def search(self, queryset, keywords):
+        terms = search_terms(keywords)
+        if not terms:
+            return queryset.none()
+        query = SearchQuery(
+            " & ".join(
+                f"{word}:*" if prefix else word for word, prefix in terms
+            ),
+            search_type="raw",
+        )
+        vector = SearchVector("name", weight="A") + SearchVector(
+            "description", weight="B"
+        )
+        return ordered_by_rank(
+            queryset.annotate(search=vector).filter(search=query),
+            SearchRank(vector, query),
+            descending=True,
+        )
+
+    def index_products(self, products):
+        """Vectors are computed by the search query"""
+
+    def remove_products(self, product_ids):
+        """Vectors are computed by the search query"""
+
+    def rebuild(self):
+        """Vectors are computed by the search query"""
+
+
+class BasicSearchBackend:
+    """Unranked substring search for databases without a text index"""
+
+    def search(self, queryset, keywords):
+        terms = search_terms(keywords)
+        if not terms:
+            return queryset.none()
+        for word, _ in terms:
+            queryset = queryset.filter(
+                Q(name__icontains=word) | Q(description__icontains=word)
+            )
+        return queryset
+
+    def index_products(self, products):
+        """Nothing is indexed"""
+
+    def remove_products(self, product_ids):
+        """Nothing is indexed"""
+
+    def rebuild(self):
+        """Nothing is indexed"""
+
+
+SEARCH_BACKENDS = {
+    "fts5": FTS5SearchBackend,
+    "postgres": PostgresSearchBackend,
+    "basic": BasicSearchBackend,
+}
+
+
+def get_search_backend():
+    """Return the search backend selected by settings.PRODUCT_SEARCH_BACKEND"""
+    name = settings.PRODUCT_SEARCH_BACKEND
+    if name == "auto":
+        name = {"sqlite": "fts5", "postgresql": "postgres"}.get(
+            connection.vendor, "basic"
+        )
+    return SEARCH_BACKENDS[name]()
@@ -0,0 +1,127 @@
+import heapq
+from decimal import Decimal
+
+from django.utils import timezone
+
+from shop.models import Bid, ProxyBid
+from shop.services.bid_engines import get_bid_engine
+from shop.services.bidding import lowest_outbid
+
+MAX_RESOLVE_ATTEMPTS = 5
+
+
+class ProxyHeap:
+    """
+    Max-heap of an auction's proxy bids ordered by maximum amount.
+
+    Equal maximums are ordered by registration time, so the earlier proxy
+    wins a tie. Building the heap is O(n) and each pop costs O(log n).
+    """
+
+    def __init__(self, proxies=()):
+        self._heap = [self._entry(proxy) for proxy in proxies]
+        heapq.heapify(self._heap)
+
+    @staticmethod
+    def _entry(proxy):
+        return (-proxy.max_amount, proxy.created_at, proxy.id, proxy)
+
+    def pop(self):
+        if not self._heap:
+            return None
+        return heapq.heappop(self._heap)[-1]
+
+
+def minimum_raise(snapshot):
+    """Lowest amount a proxy may bid against the current highest bid"""
+    lowest = lowest_outbid(snapshot.highest_bid, snapshot.bidding_step)
+    if lowest is not None:
+        return lowest
+    return snapshot.starting_price or snapshot.bidding_step or Decimal("0.01")
+
+
+def proxy_bid(proxy, amount):
+    return Bid(
+        auction_id=proxy.auction_id,
+        bidder_id=proxy.bidder_id,
+        bid_amount=amount,
+    )
+
+
+def decide_proxy_bids(snapshot, heap):
+    """
+    Work out the visible bids produced by the competing proxies.
+
+    Only the two strongest proxies matter: the runner-up bids its full
+    maximum and the leader answers with the lowest amount outbidding it.
+    When the leader's maximum cannot outbid the runner-up's, the leader
+    bids its maximum alone, which the runner-up cannot outbid either.
+    Every bid follows the rule of bids placed by hand, see
+    shop.services.bidding.outbids. Returns the Bid rows to store, in
+    order, without saving.
+    """
+    leader = heap.pop()
+    if leader is None:
+        return []
+    runner_up = heap.pop()
+
+    floor = minimum_raise(snapshot)
+    if runner_up is not None and runner_up.max_amount < floor:
+        runner_up = None
+
+    if runner_up is None:
+        if (
+            leader.bidder_id == snapshot.highest_bidder_id
+            or leader.max_amount < floor
+        ):
+            return []
+        return [proxy_bid(leader, floor)]
+
+    price = lowest_outbid(runner_up.max_amount, snapshot.bidding_step)
+    if leader.max_amount < price:
+        # Equal maximums included, the earlier proxy keeps the lead
+        if leader.bidder_id == snapshot.highest_bidder_id:
+            return []
+        return [proxy_bid(leader, leader.max_amount)]
+
+    return [
+        proxy_bid(runner_up, runner_up.max_amount),
+        proxy_bid(leader, price),
+    ]
+
+
+def auction_is_open(snapshot, now):
+    return bool(
+        snapshot.start_time and snapshot.end_time
+        and snapshot.start_time < now < snapshot.end_time
+    )
+
+
+def resolve_proxy_bids(auction_id):
+    """
+    Let the auction's proxies answer the current highest bid.
+
+    The proxies able to outbid the current price are loaded into a
+    ProxyHeap and the resulting visible bids are committed through the
+    bid engine in one bulk insert. A concurrent bid makes the commit fail,
+    in which case the auction is resolved again from a fresh snapshot.
+    """
+    engine = get_bid_engine()
+    for _ in range(MAX_RESOLVE_ATTEMPTS):
+        snapshot = engine.snapshot(auction_id)
+        if snapshot is None or not auction_is_open(snapshot, timezone.now()):
+            return []
+
+        heap = ProxyHeap(
+            ProxyBid.objects.filter(
+                auction_id=auction_id,
+                is_active=True,
+                max_amount__gte=minimum_raise(snapshot),
+            )
+        )
+        bids = decide_proxy_bids(snapshot, heap)
+        if not bids:
+            return []
+        if engine.commit_bids(auction_id, snapshot.highest_bid, bids):
+            return bids
+    return []
@@ -0,0 +1,226 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.metrics import metrics
+from shop.models import Product, UserStats
+from shop.services.auction_rollups import record_views_in_rollups
+
+logger = logging.getLogger(__name__)
+
+VIEW_STORED = "stored"
+VIEW_EXISTS = "exists"
+VIEW_UNKNOWN_AUCTION = "unknown_auction"
+# Buffered views that could not be stored
+VIEW_FAILED = "failed"
+
+
+def store_views(views):
+    """
+    Store views given as a {(user id, auction id): viewed at} dict.
+
+    Auctions are checked with one IN query, already stored pairs with
+    another, and the new views are written with a single bulk insert.
+    Returns the outcome of every pair: VIEW_STORED, VIEW_EXISTS or
+    VIEW_UNKNOWN_AUCTION.
+    """
+    auction_ids = {auction_id for _, auction_id in views}
+    user_ids = {user_id for user_id, _ in views}
+    existing_auctions = set(
+        Product.objects.filter(id__in=auction_ids).values_list("id", flat=True)
+    )
+    stored = set(
+        UserStats.objects.filter(
+            auction_id__in=existing_auctions, user_id__in=user_ids
+        ).values_list("user_id", "auction_id")
+    )
+
+    outcomes = {}
+    new_views = []
+    for (user_id, auction_id), viewed_at in views.items():
+        if auction_id not in existing_auctions:
+            outcomes[(user_id, auction_id)] = VIEW_UNKNOWN_AUCTION
+        elif (user_id, auction_id) in stored:
+            outcomes[(user_id, auction_id)] = VIEW_EXISTS
+        else:
+            outcomes[(user_id, auction_id)] = VIEW_STORED
+            new_views.append(
+                UserStats(
+                    user_id=user_id,
+                    auction_id=auction_id,
+                    view_timestamp=viewed_at,
+                )
+            )
+
+    if new_views:
+        with transaction.atomic():
+            # Another worker may store the same view meanwhile
+            UserStats.objects.bulk_create(new_views, ignore_conflicts=True)
+            record_views_in_rollups(new_views)
+    return outcomes
+
+
+class ViewBuffer:
+    """
+    In-process buffer coalescing auction views before they are stored.
+
+    A (user, auction) pair seen within the last window seconds is counted
+    as coalesced and not buffered again, since only one view per pair is
+    stored anyway. Buffered views are written by a background thread every
+    flush_interval seconds, or as soon as flush_size views are pending, and
+    once more when the interpreter exits. Views arriving while max_pending
+    views are already waiting are dropped. A batch failing to flush
+    max_retries times in a row is stored view by view, and the views still
+    failing are dropped as well.
+
+    Recorded views are counted in the view_buffer metrics as coalesced,
+    dropped or buffered, and buffered views once flushed as stored,
+    already_stored (by another worker or earlier), unknown_auction or
+    failed.
+    """
+
+    def __init__(
+        self,
+        window=600,
+        flush_interval=2.0,
+        flush_size=1000,
+        max_pending=100000,
+        max_retries=3,
+    ):
+        self.window = window
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._seen = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._failures = 0
+        self._wakeup = threading.Event()
+        self._flusher = None
+
+    def start(self):
+        """Start the flush thread and flush on interpreter exit"""
+        self._flusher = threading.Thread(
+            target=self._run_flusher, name="view-buffer-flusher", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def record(self, user_id, auction_id):
+        """Buffer a view, returns False when it was coalesced or dropped"""
+        key = (user_id, auction_id)
+        now = time.monotonic()
+        with self._lock:
+            self._forget_expired(now)
+            if key in self._seen:
+                metrics.incr("view_buffer.coalesced")
+                return False
+            if len(self._pending) >= self.max_pending:
+                metrics.incr("view_buffer.dropped")
+                return False
+            self._seen[key] = now + self.window
+            self._pending[key] = timezone.now()
+            pending_count = len(self._pending)
+
+        metrics.incr("view_buffer.buffered")
+        if pending_count >= self.flush_size:
+            self._wakeup.set()
+        return True
+
+    def _forget_expired(self, now):
+        # Entries share one window, so insertion order is expiry order
+        while self._seen:
+            key, expires = next(iter(self._seen.items()))
+            if expires > now:
+                return
+            del self._seen[key]
+
+    def flush(self):
+        """Store the buffered views not stored yet, in one transaction"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+
+            try:
+                outcomes = store_views(batch)
+            except Exception:
+                self._failures += 1
+                if self._failures < self.max_retries:
+                    logger.exception(
+                        "Failed to flush %d views, will retry", len(batch)
+                    )
+                    with self._lock:
+                        for key, viewed_at in batch.items():
+                            self._pending.setdefault(key, viewed_at)
+                    return
+                logger.exception(
+                    "Failed to flush %d views %d times, "
+                    "storing them one at a time",
+                    len(batch),
+                    self._failures,
+                )
+                outcomes = self._store_each(batch)
+            self._failures = 0
+
+            counts = Counter(outcomes.values())
+            metrics.incr("view_buffer.stored", counts[VIEW_STORED])
+            metrics.incr("view_buffer.already_stored", counts[VIEW_EXISTS])
+            metrics.incr(
+                "view_buffer.unknown_auction", counts[VIEW_UNKNOWN_AUCTION]
+            )
+            metrics.incr("view_buffer.failed", counts[VIEW_FAILED])
+
+    def _store_each(self, batch):
+        outcomes = {}
+        for key, viewed_at in batch.items():
+            try:
+                outcomes.update(store_views({key: viewed_at}))
+            except Exception:
+                logger.exception(
+                    "Dropped the view of auction %s by user %s",
+                    key[1],
+                    key[0],
+                )
+                outcomes[key] = VIEW_FAILED
+        return outcomes
+
+    def _run_flusher(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_view_buffer():
+    """Return the process-wide view buffer, starting it on first use"""
+    global _buffer
+    if _buffer is not None:
+        return _buffer
+
+    with _buffer_lock:
+        if _buffer is None:
+            view_buffer = ViewBuffer(
+                window=settings.VIEW_BUFFER_WINDOW,
+                flush_interval=settings.VIEW_BUFFER_FLUSH_INTERVAL,
+                flush_size=settings.VIEW_BUFFER_FLUSH_SIZE,
+                max_pending=settings.VIEW_BUFFER_MAX_PENDING,
+                max_retries=settings.VIEW_BUFFER_FLUSH_RETRIES,
+            )
+            view_buffer.start()
+            _buffer = view_buffer
+    return _buffer
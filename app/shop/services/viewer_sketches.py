@@ -0,0 +1,168 @@
+import math
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from shop.models import AuctionDailyStats
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+
+def sketch_precision(error=None):
+    """Register bits for a relative standard error, 1.04 / sqrt(2 ** p)"""
+    error = error or settings.VIEWER_SKETCH_ERROR
+    precision = math.ceil(math.log2((1.04 / error) ** 2))
+    return min(max(precision, MIN_PRECISION), MAX_PRECISION)
+
+
+def hash_ids(ids):
+    """64-bit splitmix64 hashes of integer ids, vectorized"""
+    with np.errstate(over="ignore"):
+        x = np.asarray(ids, dtype=np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def leading_zeros(x):
+    """Leading zero bits of non-zero uint64 values"""
+    zeros = np.zeros(x.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        short = x < (np.uint64(1) << np.uint64(64 - shift))
+        zeros[short] += shift
+        x = np.where(short, x << np.uint64(shift), x)
+    return zeros
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch estimating the number of distinct integer ids.
+
+    Holds 2 ** precision one-byte registers with a relative standard error
+    of 1.04 / sqrt(2 ** precision). Sketches merge by keeping the highest
+    register values, so they can be built per auction and day and combined
+    on read. Stored as the precision byte followed by the zlib compressed
+    registers, a mostly empty sketch takes a few dozen bytes.
+    """
+
+    def __init__(self, precision=None, registers=None):
+        self.precision = precision or sketch_precision()
+        if registers is None:
+            registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        self.registers = registers
+
+    def add(self, ids):
+        """Count an iterable of integer ids"""
+        hashes = hash_ids(list(ids))
+        if not hashes.size:
+            return self
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # A sentinel bit caps the rank at 64 - precision + 1
+        rest = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        np.maximum.at(self.registers, index, leading_zeros(rest) + 1)
+        return self
+
+    def fold(self, precision):
+        """Copy of the sketch reduced to a lower precision"""
+        if precision == self.precision:
+            return HyperLogLog(precision, self.registers.copy())
+        dropped = self.precision - precision
+        groups = self.registers.reshape(1 << precision, 1 << dropped)
+        # The dropped index bits now lead the hash bits the rank is taken
+        # from, the old rank only counts when they are all zero
+        low = np.arange(1 << dropped, dtype=np.uint64)
+        shifted = np.maximum(low, 1) << np.uint64(64 - dropped)
+        low_ranks = leading_zeros(shifted) + 1
+        ranks = np.where(
+            low == 0, dropped + groups.astype(np.int64), low_ranks
+        )
+        ranks = np.where(groups > 0, ranks, 0)
+        return HyperLogLog(precision, ranks.max(axis=1).astype(np.uint8))
+
+    def merge(self, other):
+        """Union with another sketch, folding the finer one to the coarser"""
+        if other.precision < self.precision:
+            merged = self.fold(other.precision)
+        else:
+            merged = HyperLogLog(self.precision, self.registers.copy())
+            other = other.fold(self.precision)
+        np.maximum(merged.registers, other.registers, out=merged.registers)
+        return merged
+
+    def estimate(self):
+        m = len(self.registers)
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        harmonic = np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        raw = alpha * m * m / harmonic
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            # Linear counting is more accurate for small cardinalities
+            return round(m * math.log(m / empty))
+        return round(raw)
+
+    def to_bytes(self):
+        data = zlib.compress(self.registers.tobytes(), 1)
+        return bytes([self.precision]) + data
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        registers = np.frombuffer(
+            zlib.decompress(data[1:]), dtype=np.uint8
+        ).copy()
+        return cls(data[0], registers)
+
+    @classmethod
+    def union(cls, sketches):
+        """Merge many serialized sketches at once, None for no sketch"""
+        sketches = [cls.from_bytes(data) for data in sketches if data]
+        if not sketches:
+            return None
+        precision = min(sketch.precision for sketch in sketches)
+        stacked = np.stack(
+            [sketch.fold(precision).registers for sketch in sketches]
+        )
+        return cls(precision, stacked.max(axis=0))
+
+
+def add_viewers_to_sketches(viewers):
+    """
+    Add viewers to the sketches of their rollups, given as a
+    {(auction id, day): user ids} dict. The rollup rows must exist already,
+    they are locked while their sketches are merged.
+    """
+    if not viewers:
+        return
+    keys = Q()
+    for auction_id, day in viewers:
+        keys |= Q(auction_id=auction_id, day=day)
+    with transaction.atomic():
+        rollups = list(
+            AuctionDailyStats.objects.select_for_update()
+            .filter(keys)
+            .only("id", "auction_id", "day", "viewer_sketch")
+        )
+        for rollup in rollups:
+            if rollup.viewer_sketch:
+                sketch = HyperLogLog.from_bytes(rollup.viewer_sketch)
+            else:
+                sketch = HyperLogLog()
+            sketch.add(viewers[(rollup.auction_id, rollup.day)])
+            rollup.viewer_sketch = sketch.to_bytes()
+        AuctionDailyStats.objects.bulk_update(
+            rollups, ["viewer_sketch"], batch_size=500
+        )
+
+
+def estimate_unique_viewers(rollups):
+    """Estimated distinct viewers over a queryset of daily rollups"""
+    sketch = HyperLogLog.union(rollups.values_list("viewer_sketch", flat=True))
+    return sketch.estimate() if sketch else 0
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from shop.models import Product, ProductAttributeValues
+from shop.services import (get_search_backend, refresh_indexed_products,
+                           reload_product_index, update_auction_book)
+
+
+@receiver(post_save, sender=Product)
+def refresh_auction_book(sender, instance, created, **kwargs):
+    """Keep the bid engine's window and step in line with edited auctions"""
+    if not created:
+        update_auction_book(instance)
+
+
+@receiver(post_save, sender=Product)
+def index_product_text(sender, instance, update_fields=None, **kwargs):
+    """Keep the search index in line with product names and descriptions"""
+    if update_fields is None or {"name", "description"} & set(update_fields):
+        get_search_backend().index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_text(sender, instance, **kwargs):
+    get_search_backend().remove_products([instance.id])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_indexed_product(sender, instance, **kwargs):
+    refresh_indexed_products([instance.id])
+
+
+@receiver(post_save, sender=ProductAttributeValues)
+@receiver(post_delete, sender=ProductAttributeValues)
+def refresh_indexed_attribute_values(sender, instance, **kwargs):
+    refresh_indexed_products([instance.product_id])
+
+
+@receiver(m2m_changed, sender=Product.category.through)
+@receiver(m2m_changed, sender=ProductAttributeValues)
+def refresh_indexed_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """Re-index products whose categories or attribute values changed"""
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        refresh_indexed_products([instance.id])
+    elif pk_set:
+        refresh_indexed_products(pk_set)
+    elif action == "post_clear":
+        # The cleared products are not known anymore
+        reload_product_index()
+
+
+@receiver(post_save, sender=get_user_model())
+def refresh_indexed_seller(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    """Add or drop the products of sellers activated or deactivated"""
+    if created or (
+        update_fields is not None and "is_active" not in update_fields
+    ):
+        return
+    refresh_indexed_products(
+        Product.objects.filter(user=instance).values_list("id", flat=True)
+    )
@@ -0,0 +1,181 @@
+import asyncio
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from shop.models import Product
+from shop.services.auction_events import (BID_EVENT, CLOSED_EVENT,
+                                          EXTENDED_EVENT, auction_events,
+                                          encode_event)
+
+AUCTION_STREAM_PATH = re.compile(
+    r"^/api/shop/auction-stream/(?P<auction_id>\d+)/$"
+)
+
+STREAM_HEADERS = [
+    (b"content-type", b"text/event-stream"),
+    (b"cache-control", b"no-cache"),
+    (b"x-accel-buffering", b"no"),
+]
+
+
+def get_token_key(scope):
+    """Read the auth token from the query string or the Authorization header"""
+    query = parse_qs(scope.get("query_string", b"").decode())
+    if query.get("token"):
+        return query["token"][0]
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0] == "Token":
+                return parts[1]
+    return None
+
+
+@sync_to_async
+def is_authenticated(token_key):
+    return Token.objects.filter(key=token_key, user__is_active=True).exists()
+
+
+@sync_to_async
+def load_auction(auction_id):
+    return (
+        Product.objects.filter(pk=auction_id)
+        .values("current_highest_bid", "end_time")
+        .first()
+    )
+
+
+async def send_error(send, status_code, detail):
+    body = encode_event("error", {"detail": detail})
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": STREAM_HEADERS,
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+HEARTBEAT = (None, None, b": ping\n\n")
+WAKE_UP = (None, None, None)
+
+
+async def stream_events(auction_id, end_time, receive, send, initial=None):
+    """
+    Push an auction's events to one client until it disconnects or closes.
+
+    An idle client costs one queue, one task watching for the disconnect and
+    a timer. Disconnects, heartbeats and the end of the auction (moved by
+    "extended" events) only wake the client through its queue, so delivering
+    an event never creates a task.
+    """
+    loop = asyncio.get_running_loop()
+    queue = auction_events.subscribe(auction_id)
+    heartbeat = settings.AUCTION_STREAM_HEARTBEAT
+    timers = {}
+
+    def wake(item):
+        # A full queue already has a pending item that will wake the client
+        if not queue.full():
+            queue.put_nowait(item)
+
+    def beat():
+        wake(HEARTBEAT)
+        timers["heartbeat"] = loop.call_later(heartbeat, beat)
+
+    def schedule_close():
+        if "close" in timers:
+            timers["close"].cancel()
+        if end_time is not None:
+            remaining = (end_time - timezone.now()).total_seconds()
+            timers["close"] = loop.call_later(max(remaining, 0), wake, WAKE_UP)
+
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    disconnect.add_done_callback(lambda _: wake(WAKE_UP))
+    timers["heartbeat"] = loop.call_later(heartbeat, beat)
+    schedule_close()
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": STREAM_HEADERS,
+            }
+        )
+        if initial is not None:
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": initial,
+                    "more_body": True,
+                }
+            )
+
+        while True:
+            event, data, body = await queue.get()
+            if disconnect.done():
+                return
+
+            if event == EXTENDED_EVENT:
+                end_time = data["end_time"]
+                schedule_close()
+            elif (
+                event != CLOSED_EVENT
+                and end_time is not None
+                and end_time <= timezone.now()
+            ):
+                event = CLOSED_EVENT
+                body = encode_event(CLOSED_EVENT, {"end_time": end_time})
+
+            if event == CLOSED_EVENT:
+                await send({"type": "http.response.body", "body": body})
+                return
+            if body is not None:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": body,
+                        "more_body": True,
+                    }
+                )
+    finally:
+        auction_events.unsubscribe(auction_id, queue)
+        disconnect.cancel()
+        for timer in timers.values():
+            timer.cancel()
+
+
+async def auction_stream(scope, receive, send, auction_id):
+    """Server-Sent Events endpoint replacing polling of auction-bids/"""
+    token_key = get_token_key(scope)
+    if not token_key or not await is_authenticated(token_key):
+        await send_error(
+            send, 401, "Authentication credentials were not provided."
+        )
+        return
+
+    auction = await load_auction(auction_id)
+    if auction is None:
+        await send_error(send, 404, "Auction not found.")
+        return
+
+    initial = None
+    highest_bid = auction["current_highest_bid"]
+    if highest_bid:
+        initial = encode_event(BID_EVENT, {"amount": highest_bid})
+    await stream_events(
+        auction_id, auction["end_time"], receive, send, initial
+    )
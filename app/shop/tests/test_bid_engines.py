@@ -0,0 +1,86 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import User
+from shop.models import Bid, Product
+from shop.services.auction_closing import close_auctions
+from shop.services.bid_engines import MemoryBidEngine
+from shop.services.bidding import BidRejected
+
+
+@override_settings(
+    AUCTION_SOFT_CLOSE_WINDOW=60, AUCTION_SOFT_CLOSE_EXTENSION=120
+)
+class MemoryBidEngineClosingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            "seller@example.com", "seller", "password"
+        )
+        cls.bidder = User.objects.create_user(
+            "bidder@example.com", "bidder", "password"
+        )
+        now = timezone.now()
+        cls.auction = Product.objects.create(
+            slug="auction",
+            name="Auction",
+            description="Auction",
+            user=seller,
+            start_time=now - timedelta(hours=1),
+            end_time=now + timedelta(seconds=30),
+            bidding_step=Decimal("1"),
+        )
+
+    def setUp(self):
+        self.engine = MemoryBidEngine()
+
+    def bid(self, amount):
+        return self.engine.place_bid(self.auction.id, self.bidder, amount)
+
+    def test_extension_is_stored_before_the_flush(self):
+        ended_at = self.auction.end_time
+        placed = self.bid(Decimal("10"))
+
+        self.assertTrue(placed.extended)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.end_time, placed.end_time)
+        self.assertEqual(close_auctions([self.auction.id], ended_at), [])
+
+    def test_edit_keeps_the_extension(self):
+        stale = Product.objects.get(pk=self.auction.id)
+        placed = self.bid(Decimal("10"))
+        stale.save()
+        self.engine.update_book(stale)
+
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.end_time, placed.end_time)
+        self.assertEqual(
+            self.engine.snapshot(self.auction.id).end_time, placed.end_time
+        )
+
+    def test_bids_are_rejected_once_the_auction_is_closed(self):
+        self.bid(Decimal("10"))
+        later = timezone.now() + timedelta(hours=1)
+        closed = close_auctions([self.auction.id], later)
+        self.assertEqual(closed, [self.auction.id])
+
+        with self.assertLogs("shop.services.bid_engines", "ERROR"):
+            self.engine.flush()
+        self.auction.refresh_from_db()
+        self.assertFalse(Bid.objects.exists())
+        self.assertIsNone(self.auction.current_highest_bid)
+        self.assertIsNone(self.auction.winner_id)
+        with self.assertRaises(BidRejected):
+            self.bid(Decimal("20"))
+
+    def test_extension_of_a_closed_auction_is_rejected(self):
+        self.engine.get_book(self.auction.id)
+        Product.objects.filter(pk=self.auction.id).update(is_closed=True)
+
+        with self.assertRaises(BidRejected):
+            self.bid(Decimal("10"))
+        self.engine.flush()
+        self.assertFalse(Bid.objects.exists())
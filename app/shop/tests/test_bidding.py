@@ -0,0 +1,147 @@
+import itertools
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import User
+from shop.management.commands.bench_bids import next_amount
+from shop.models import Bid, Product
+from shop.services.bidding import BidRejected, outbids, place_bid
+
+
+class ConcurrentBiddingTests(TransactionTestCase):
+    bidders = 100
+    bids_per_bidder = 5
+
+    def setUp(self):
+        seller = User.objects.create_user(
+            "seller@example.com", "seller", "password"
+        )
+        now = timezone.now()
+        self.auction = Product.objects.create(
+            slug="auction",
+            name="Auction",
+            description="Auction",
+            user=seller,
+            start_time=now - timedelta(hours=1),
+            end_time=now + timedelta(hours=1),
+            bidding_step=Decimal("1"),
+        )
+        User.objects.bulk_create(
+            User(email=f"bidder{i}@example.com", name=f"bidder{i}")
+            for i in range(self.bidders)
+        )
+        self.users = list(User.objects.filter(email__startswith="bidder"))
+
+    def bid(self, user, started, start, accepted, lock):
+        start.wait()
+        try:
+            for _ in range(self.bids_per_bidder):
+                amount = next_amount(started)
+                for attempt in itertools.count():
+                    try:
+                        placed = place_bid(self.auction.id, user, amount)
+                    except BidRejected:
+                        break
+                    except OperationalError:
+                        # The in-memory test database reports a locked table
+                        # instead of waiting, the bid was rolled back
+                        backoff = 0.001 * 2 ** min(attempt, 8)
+                        time.sleep(random.uniform(0, backoff))
+                        continue
+                    with lock:
+                        accepted.append(placed.bid.bid_amount)
+                    break
+        finally:
+            connection.close()
+
+    def test_no_lost_updates(self):
+        accepted = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.bidders)
+        started = time.time()
+        threads = [
+            threading.Thread(
+                target=self.bid, args=(user, started, start, accepted, lock)
+            )
+            for user in self.users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.auction.refresh_from_db()
+        stored = list(
+            Bid.objects.filter(auction=self.auction)
+            .order_by("id")
+            .values_list("bid_amount", flat=True)
+        )
+        self.assertGreater(len(accepted), 1)
+        self.assertEqual(sorted(stored), sorted(accepted))
+        self.assertEqual(self.auction.bid_count, len(accepted))
+        self.assertEqual(self.auction.current_highest_bid, max(accepted))
+        # Every stored bid outbid the one stored before it
+        for previous, amount in zip(stored, stored[1:]):
+            self.assertTrue(
+                outbids(amount, previous, self.auction.bidding_step),
+                f"{amount} stored after {previous}",
+            )
+        self.assertEqual(stored[-1], max(accepted))
+
+
+class BidViewTests(APITestCase):
+    url = "/api/shop/bid/create/"
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            "seller@example.com", "seller", "password"
+        )
+        cls.bidder = User.objects.create_user(
+            "bidder@example.com", "bidder", "password"
+        )
+        now = timezone.now()
+        cls.auction = Product.objects.create(
+            slug="auction",
+            name="Auction",
+            description="Auction",
+            user=seller,
+            start_time=now - timedelta(hours=1),
+            end_time=now + timedelta(hours=1),
+            bidding_step=Decimal("1"),
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.bidder)
+
+    def bid(self, amount):
+        return self.client.post(
+            self.url, {"auction": self.auction.id, "bid_amount": amount}
+        )
+
+    def assertNotPlaced(self, response):
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("bid_amount", response.data)
+        self.auction.refresh_from_db()
+        self.assertIsNone(self.auction.current_highest_bid)
+        self.assertFalse(Bid.objects.exists())
+
+    def test_bid_placed(self):
+        response = self.bid("30.50")
+        self.assertEqual(response.status_code, 201)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_highest_bid, Decimal("30.50"))
+
+    def test_amount_too_large_for_the_auction_is_rejected(self):
+        self.assertNotPlaced(self.bid("123456789"))
+
+    def test_amount_with_more_than_two_decimal_places_is_rejected(self):
+        self.assertNotPlaced(self.bid("30.005"))
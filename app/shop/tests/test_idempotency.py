@@ -0,0 +1,117 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.metrics import metrics
+from core.models import User
+from shop.models import Bid, Product
+from shop.services.idempotency import IdempotencyCache
+
+
+class IdempotencyCacheTests(SimpleTestCase):
+    def test_entries_expire_after_ttl(self):
+        cache = IdempotencyCache(10, 60, "test_idempotency")
+        with mock.patch("shop.services.idempotency.time.monotonic") as clock:
+            clock.return_value = 1000.0
+            cache.put("key", 201, {"detail": "placed"})
+            clock.return_value = 1059.0
+            self.assertEqual(cache.get("key"), (201, {"detail": "placed"}))
+            clock.return_value = 1060.0
+            self.assertIsNone(cache.get("key"))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = IdempotencyCache(2, 60, "test_idempotency")
+        cache.put("first", 201, {})
+        cache.put("second", 201, {})
+        cache.get("first")
+        cache.put("third", 201, {})
+        self.assertIsNone(cache.get("second"))
+        self.assertIsNotNone(cache.get("first"))
+        self.assertIsNotNone(cache.get("third"))
+
+
+class IdempotentBidTests(APITestCase):
+    url = "/api/shop/bid/create/"
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            "seller@example.com", "seller", "password"
+        )
+        cls.bidder = User.objects.create_user(
+            "bidder@example.com", "bidder", "password"
+        )
+        now = timezone.now()
+        cls.auction = Product.objects.create(
+            slug="auction",
+            name="Auction",
+            description="Auction",
+            user=seller,
+            start_time=now - timedelta(hours=1),
+            end_time=now + timedelta(hours=1),
+            bidding_step=Decimal("1"),
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.bidder)
+        self.responses = IdempotencyCache(10, 600, "test_idempotency")
+        patcher = mock.patch(
+            "shop.views.product_views.bid_responses", self.responses
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def bid(self, amount, key):
+        return self.client.post(
+            self.url,
+            {"auction": self.auction.id, "bid_amount": amount},
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_repeated_key_replays_the_response(self):
+        first = self.bid("30.00", "retry-me")
+        retry = self.bid("30.00", "retry-me")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", first)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Bid.objects.count(), 1)
+
+    def test_evicted_key_falls_back_to_the_unique_constraint(self):
+        self.responses.max_size = 1
+        first = self.bid("30.00", "retry-me")
+        # A response stored for another request evicts the original's
+        self.responses.put((self.bidder.id, "other"), 201, {})
+        duplicates = metrics.snapshot().get(
+            "bid_idempotency.db_duplicates", 0
+        )
+
+        # Outbids the original, so only the constraint on the key stops it
+        retry = self.bid("40.00", "retry-me")
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", retry)
+        self.assertEqual(retry.data["end_time"], first.data["end_time"])
+        self.assertEqual(
+            list(Bid.objects.values_list("bid_amount", flat=True)),
+            [Decimal("30.00")],
+        )
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_highest_bid, Decimal("30.00"))
+        self.assertEqual(self.auction.bid_count, 1)
+        self.assertEqual(
+            metrics.snapshot()["bid_idempotency.db_duplicates"],
+            duplicates + 1,
+        )
+
+    def test_key_longer_than_stored_is_rejected(self):
+        response = self.bid("30.00", "k" * 65)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Bid.objects.exists())
@@ -0,0 +1,182 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import User
+from shop.models import (Category, Product, ProductAttribute,
+                         ProductAttributeValue)
+from shop.services.product_index import INDEX_VERSION_KEY
+
+SEARCH_URL = "/api/shop/products/product-search/?page_size=100"
+
+
+def run_on_commit(func):
+    func()
+
+
+class ProductIndexTestData:
+    @classmethod
+    def setUpTestData(cls):
+        cls.sellers = [
+            User.objects.create_user(
+                f"seller{i}@example.com", f"seller{i}", "password"
+            )
+            for i in range(2)
+        ]
+        parent = Category.objects.create(name="Parent", slug="parent")
+        child = Category.objects.create(
+            name="Child", slug="child", parent=parent
+        )
+        other = Category.objects.create(name="Other", slug="other")
+        cls.categories = [parent, child, other]
+        color = ProductAttribute.objects.create(name="Color", slug="color")
+        size = ProductAttribute.objects.create(name="Size", slug="size")
+        cls.colors = [
+            ProductAttributeValue.objects.create(
+                product_attribute=color, attribute_value=value
+            )
+            for value in ("red", "green", "blue")
+        ]
+        cls.sizes = [
+            ProductAttributeValue.objects.create(
+                product_attribute=size, attribute_value=value
+            )
+            for value in ("small", "large")
+        ]
+
+        now = timezone.now()
+        places = [("North", "Oslo"), ("north", "Bergen"), ("South", "Oslo")]
+        for i in range(18):
+            region, city = places[i % 3]
+            product = Product.objects.create(
+                slug=f"product-{i}",
+                name=f"Product {i}",
+                description="Product",
+                user=cls.sellers[i % 2],
+                region=region,
+                city=city,
+                # Distinct priorities, the ORM leaves ties unordered
+                priority=(i * 7) % 18,
+                # Hidden products are never searchable
+                is_active=i != 4,
+                status=i != 5,
+                start_time=now,
+                end_time=now + timedelta(hours=1),
+                bidding_step=Decimal("1"),
+            )
+            product.category.set([cls.categories[i % 3]])
+            product.attribute_values.set(
+                [cls.colors[i % 3], cls.sizes[i % 2]]
+                if i % 4
+                else [cls.colors[i % 3]]
+            )
+
+    def setUp(self):
+        # A new version makes the index rebuild from this test's data
+        cache.delete(INDEX_VERSION_KEY)
+
+    def search(self, filters):
+        return self.client.post(SEARCH_URL, filters, format="json")
+
+
+class ProductIndexParityTests(ProductIndexTestData, APITestCase):
+    def assertSameAnswer(self, filters):
+        with override_settings(PRODUCT_INDEX=False):
+            expected = self.search(filters)
+        with override_settings(PRODUCT_INDEX=True):
+            with mock.patch(
+                "shop.views.product_views.PublicProductViewSet.get_attributes"
+            ) as orm_facets:
+                indexed = self.search(filters)
+            orm_facets.assert_not_called()
+
+        self.assertEqual(expected.status_code, 200)
+        self.assertEqual(indexed.status_code, 200)
+        self.assertEqual(
+            [item["id"] for item in indexed.data["results"]],
+            [item["id"] for item in expected.data["results"]],
+        )
+        self.assertEqual(indexed.data["count"], expected.data["count"])
+        self.assertEqual(
+            indexed.data["attributes"], expected.data["attributes"]
+        )
+        return expected
+
+    def test_no_filters(self):
+        response = self.assertSameAnswer({})
+        self.assertEqual(response.data["count"], 16)
+
+    def test_recent_first(self):
+        self.assertSameAnswer({"recent": 1})
+
+    def test_category_with_its_descendants(self):
+        response = self.assertSameAnswer({"category": self.categories[0].id})
+        self.assertEqual(response.data["count"], 11)
+        self.assertSameAnswer({"category": self.categories[1].id})
+
+    def test_seller_region_and_city(self):
+        self.assertSameAnswer({"user_id": self.sellers[1].id})
+        self.assertSameAnswer({"region": "NORTH"})
+        self.assertSameAnswer({"region": "north", "city": "oslo"})
+
+    def test_selected_attribute_values(self):
+        red, green, _ = self.colors
+        _, large = self.sizes
+        self.assertSameAnswer({"filters": [{"selected": [red.id]}]})
+        self.assertSameAnswer(
+            {"filters": [{"selected": [red.id, green.id]}]}
+        )
+        self.assertSameAnswer(
+            {
+                "category": self.categories[0].id,
+                "region": "north",
+                "filters": [
+                    {"selected": [red.id, green.id]},
+                    {"selected": [large.id]},
+                ],
+            }
+        )
+
+    def test_no_match(self):
+        response = self.assertSameAnswer({"city": "Nowhere"})
+        self.assertEqual(response.data["count"], 0)
+
+
+@override_settings(PRODUCT_INDEX=True)
+class ProductIndexRebuildTests(ProductIndexTestData, APITestCase):
+    def product_ids(self):
+        return {item["id"] for item in self.search({}).data["results"]}
+
+    def test_rebuild_command_shows_bulk_created_products(self):
+        before = self.product_ids()
+        now = timezone.now()
+        Product.objects.bulk_create(
+            [
+                Product(
+                    slug="bulk",
+                    name="Bulk",
+                    description="Bulk",
+                    user=self.sellers[0],
+                    region="North",
+                    city="Oslo",
+                    start_time=now,
+                    end_time=now + timedelta(hours=1),
+                    bidding_step=Decimal("1"),
+                )
+            ]
+        )
+        bulk_id = Product.objects.get(slug="bulk").id
+        # Saved without signals, the built index does not know it yet
+        self.assertEqual(self.product_ids(), before)
+
+        with mock.patch(
+            "shop.services.product_index.transaction.on_commit", run_on_commit
+        ):
+            call_command("rebuild_search_index", stdout=mock.Mock())
+        self.assertEqual(self.product_ids(), before | {bulk_id})
@@ -0,0 +1,113 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import User
+from shop.models import (Category, Media, Product, ProductAttribute,
+                         ProductAttributeValue)
+
+PRODUCTS_URL = "/api/shop/products/"
+
+
+class ProductListQueriesTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            "seller@example.com", "seller", "password"
+        )
+        categories = [
+            Category.objects.create(name=f"Category {i}", slug=f"category-{i}")
+            for i in range(3)
+        ]
+        attribute = ProductAttribute.objects.create(name="Color", slug="color")
+        values = [
+            ProductAttributeValue.objects.create(
+                product_attribute=attribute, attribute_value=color
+            )
+            for color in ("red", "green", "blue")
+        ]
+        now = timezone.now()
+        for i in range(12):
+            product = Product.objects.create(
+                slug=f"product-{i}",
+                name=f"Product {i}",
+                description="Product",
+                user=seller,
+                start_time=now,
+                end_time=now + timedelta(hours=1),
+                bidding_step=Decimal("1"),
+            )
+            product.category.set(categories)
+            product.attribute_values.set(values)
+            Media.objects.bulk_create(
+                Media(
+                    product=product,
+                    image=f"images/{i}-{k}.jpg",
+                    default=k == 0,
+                )
+                for k in range(3)
+            )
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        # The count, the page, then its categories, values and images
+        for page_size in (2, 10):
+            with self.assertNumQueries(5):
+                response = self.client.get(
+                    PRODUCTS_URL, {"page_size": page_size}
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data["results"]), page_size)
+
+
+class ProductDetailQueriesTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            "seller@example.com", "seller", "password"
+        )
+        category = Category.objects.create(name="Category", slug="category")
+        now = timezone.now()
+        cls.products = []
+        for size in (1, 4):
+            product = Product.objects.create(
+                slug=f"product-{size}",
+                name=f"Product {size}",
+                description="Product",
+                user=seller,
+                start_time=now,
+                end_time=now + timedelta(hours=1),
+                bidding_step=Decimal("1"),
+            )
+            product.category.set([category])
+            for i in range(size):
+                attribute = ProductAttribute.objects.create(
+                    name=f"Attribute {size}-{i}", slug=f"attribute-{size}-{i}"
+                )
+                product.attribute_values.add(
+                    *(
+                        ProductAttributeValue.objects.create(
+                            product_attribute=attribute,
+                            attribute_value=f"value {j}",
+                        )
+                        for j in range(3)
+                    )
+                )
+            Media.objects.bulk_create(
+                Media(
+                    product=product,
+                    image=f"images/{size}-{k}.jpg",
+                    default=k == 0,
+                )
+                for k in range(size * 3)
+            )
+            cls.products.append(product)
+
+    def test_detail_queries_do_not_grow_with_attributes_and_images(self):
+        # The product, then its categories, default image, attribute values
+        # with their attributes and images
+        for product in self.products:
+            with self.assertNumQueries(5):
+                response = self.client.get(f"{PRODUCTS_URL}{product.id}/")
+            self.assertEqual(response.status_code, 200)
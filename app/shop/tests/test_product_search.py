@@ -0,0 +1,105 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import User
+from shop.models import Product
+from shop.services.product_search import (BasicSearchBackend,
+                                          FTS5SearchBackend,
+                                          get_search_backend)
+
+PRODUCTS_URL = "/api/shop/products/"
+
+
+class ProductSearchTestData:
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            "seller@example.com", "seller", "password"
+        )
+        # Stored before the better match, ranking has to reorder them
+        for name, description in (
+            ("Oak chair", "Solid oak with brass feet"),
+            ("Vintage brass lamp", "Desk lamp from the seventies"),
+            ("Garden table", "Weatherproof teak"),
+        ):
+            cls.create_product(name, description)
+
+    @classmethod
+    def create_product(cls, name, description):
+        now = timezone.now()
+        return Product.objects.create(
+            slug=name.lower().replace(" ", "-"),
+            name=name,
+            description=description,
+            user=cls.seller,
+            start_time=now,
+            end_time=now + timedelta(hours=1),
+            bidding_step=Decimal("1"),
+        )
+
+    def search(self, keywords):
+        response = self.client.get(PRODUCTS_URL, {"keywords": keywords})
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.data["results"]]
+
+
+@override_settings(PRODUCT_SEARCH_BACKEND="fts5")
+class FTS5SearchTests(ProductSearchTestData, APITestCase):
+    def test_last_word_matches_as_a_prefix(self):
+        self.assertEqual(self.search("vint"), ["Vintage brass lamp"])
+        self.assertEqual(self.search("desk la"), ["Vintage brass lamp"])
+
+    def test_starred_words_match_as_prefixes(self):
+        self.assertEqual(self.search("vint* lamp"), ["Vintage brass lamp"])
+        # Only the last word is a prefix without a star
+        self.assertEqual(self.search("vint lamp"), [])
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(
+            self.search("brass"), ["Vintage brass lamp", "Oak chair"]
+        )
+        self.assertEqual(self.search("oak"), ["Oak chair"])
+
+    def test_saved_products_are_indexed(self):
+        product = self.create_product("Copper kettle", "Whistling")
+        self.assertEqual(self.search("kettle"), ["Copper kettle"])
+
+        product.name = "Copper teapot"
+        product.save()
+        self.assertEqual(self.search("kettle"), [])
+        self.assertEqual(self.search("teapot"), ["Copper teapot"])
+
+        product.delete()
+        self.assertEqual(self.search("teapot"), [])
+
+    def test_keywords_without_words_match_nothing(self):
+        self.assertEqual(self.search('"*'), [])
+
+
+@override_settings(PRODUCT_SEARCH_BACKEND="basic")
+class BasicSearchTests(ProductSearchTestData, APITestCase):
+    def test_every_word_matches_a_substring(self):
+        self.assertEqual(self.search("ntag"), ["Vintage brass lamp"])
+        self.assertEqual(
+            sorted(self.search("brass")), ["Oak chair", "Vintage brass lamp"]
+        )
+        self.assertEqual(self.search("oak teak"), [])
+
+
+class SearchBackendSelectionTests(TestCase):
+    @override_settings(PRODUCT_SEARCH_BACKEND="auto")
+    def test_auto_picks_fts5_on_sqlite(self):
+        self.assertIsInstance(get_search_backend(), FTS5SearchBackend)
+
+    @override_settings(PRODUCT_SEARCH_BACKEND="auto")
+    def test_auto_falls_back_to_basic_without_a_text_index(self):
+        with mock.patch(
+            "shop.services.product_search.connection"
+        ) as connection:
+            connection.vendor = "mysql"
+            self.assertIsInstance(get_search_backend(), BasicSearchBackend)
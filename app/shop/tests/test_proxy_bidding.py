@@ -0,0 +1,128 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import User
+from shop.models import Bid, Product, ProxyBid
+from shop.services.proxy_bidding import ProxyHeap, resolve_proxy_bids
+
+
+class ProxyBiddingTestData:
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            "seller@example.com", "seller", "password"
+        )
+        cls.bidders = [
+            User.objects.create_user(
+                f"bidder{i}@example.com", f"bidder{i}", "password"
+            )
+            for i in range(3)
+        ]
+        now = timezone.now()
+        cls.auction = Product.objects.create(
+            slug="auction",
+            name="Auction",
+            description="Auction",
+            user=seller,
+            start_time=now - timedelta(hours=1),
+            end_time=now + timedelta(hours=1),
+            bidding_step=Decimal("1"),
+        )
+
+    def add_proxy(self, bidder, max_amount, created_at=None):
+        proxy = ProxyBid.objects.create(
+            auction=self.auction, bidder=bidder, max_amount=max_amount
+        )
+        if created_at is not None:
+            ProxyBid.objects.filter(pk=proxy.pk).update(created_at=created_at)
+        return proxy
+
+    def stored_bids(self):
+        return list(
+            Bid.objects.filter(auction=self.auction)
+            .order_by("id")
+            .values_list("bidder_id", "bid_amount")
+        )
+
+
+class ProxyHeapTests(TestCase):
+    def proxy(self, pk, max_amount, created_at):
+        return ProxyBid(id=pk, max_amount=max_amount, created_at=created_at)
+
+    def test_pops_highest_maximum_then_earliest(self):
+        now = timezone.now()
+        proxies = [
+            self.proxy(1, Decimal("40"), now),
+            self.proxy(2, Decimal("50"), now + timedelta(seconds=1)),
+            self.proxy(3, Decimal("50"), now),
+            self.proxy(4, Decimal("45"), now),
+        ]
+        heap = ProxyHeap(proxies)
+        self.assertEqual([heap.pop().id for _ in proxies], [3, 2, 4, 1])
+        self.assertIsNone(heap.pop())
+
+
+class ResolveProxyBidsTests(ProxyBiddingTestData, TestCase):
+    def test_leader_bids_one_step_over_the_runner_up(self):
+        leader, runner_up, _ = self.bidders
+        self.add_proxy(leader, Decimal("50"))
+        self.add_proxy(runner_up, Decimal("40"))
+
+        resolve_proxy_bids(self.auction.id)
+
+        # Outbidding takes more than one bidding step over the runner-up
+        self.assertEqual(
+            self.stored_bids(),
+            [(runner_up.id, Decimal("40")), (leader.id, Decimal("41.01"))],
+        )
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_highest_bid, Decimal("41.01"))
+        self.assertEqual(self.auction.highest_bidder_id, leader.id)
+
+    def test_earliest_proxy_wins_a_tie(self):
+        first, second, _ = self.bidders
+        now = timezone.now()
+        self.add_proxy(second, Decimal("50"), now)
+        self.add_proxy(first, Decimal("50"), now - timedelta(seconds=1))
+
+        resolve_proxy_bids(self.auction.id)
+
+        self.assertEqual(self.stored_bids(), [(first.id, Decimal("50"))])
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.highest_bidder_id, first.id)
+
+        # The later proxy cannot outbid it, resolving again changes nothing
+        resolve_proxy_bids(self.auction.id)
+        self.assertEqual(self.stored_bids(), [(first.id, Decimal("50"))])
+
+
+class ManualBidOverProxiesTests(ProxyBiddingTestData, APITestCase):
+    url = "/api/shop/bid/create/"
+
+    def test_bid_over_every_maximum_gets_no_counter_bid(self):
+        leader, runner_up, bidder = self.bidders
+        self.add_proxy(leader, Decimal("50"))
+        self.add_proxy(runner_up, Decimal("40"))
+        resolve_proxy_bids(self.auction.id)
+
+        self.client.force_authenticate(bidder)
+        response = self.client.post(
+            self.url, {"auction": self.auction.id, "bid_amount": "60.00"}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            self.stored_bids(),
+            [
+                (runner_up.id, Decimal("40")),
+                (leader.id, Decimal("41.01")),
+                (bidder.id, Decimal("60")),
+            ],
+        )
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_highest_bid, Decimal("60"))
+        self.assertEqual(self.auction.highest_bidder_id, bidder.id)
@@ -12,16 +12,56 @@ app_name = "shop"
 
 urlpatterns = [
     path("get-data", views.get_app_data, name="get-data"),
-    path('bid/create/', product_views.CreateBidView.as_view(), name='bid-list'),
+    path(
+        'bid/create/',
+        product_views.CreateBidView.as_view(),
+        name='bid-create',
+    ),
+    path(
+        'bid/proxy/',
+        product_views.CreateProxyBidView.as_view(),
+        name='bid-proxy',
+    ),
     path("location-data", views.get_location_data, name="location-data"),
+    path("metrics/", views.get_metrics, name="metrics"),
     path('bids/list/', product_views.BidListView.as_view(), name='bid-list'),
     path('auction-bids/<int:auction_id>/', product_views.AuctionBidListView.as_view(), name='auction-bids'),
+    path(
+        'price-history/<int:auction_id>/',
+        product_views.PriceHistoryView.as_view(),
+        name='price-history',
+    ),
+    path(
+        'auction-stats/<int:auction_id>/',
+        product_views.AuctionBidStatsView.as_view(),
+        name='auction-stats',
+    ),
+    path(
+        'seller-stats/',
+        product_views.SellerBidStatsView.as_view(),
+        name='seller-stats',
+    ),
     path('bids/<int:pk>/', product_views.BidRetrieveView.as_view(), name='bid-detail'),
     path('record-view/', product_views.RecordView.as_view(), name='record_view'),
+    path(
+        'record-views/',
+        product_views.RecordViewBatch.as_view(),
+        name='record_views',
+    ),
     path('view-records/', product_views.GetAllViewRecords.as_view(), name='get-all-view-records'),
     path('get-total-bids/', product_views.GetUserTotalBids.as_view(), name='get_total_bids'),
     path('bid-chart/', product_views.BidChartView.as_view(), name='bid-chart'),
     path('views-chart/', product_views.ViewChartView.as_view(), name='view-chart'),
+    path(
+        'dashboard/',
+        product_views.SellerDashboardView.as_view(),
+        name='dashboard',
+    ),
+    path(
+        'export/<str:kind>/',
+        product_views.SellerHistoryExportView.as_view(),
+        name='history-export',
+    ),
     path('upload/', product_views.FileUploadView.as_view(), name='file-upload'),
     path('uploads/', product_views.ImageUploadView.as_view(), name='image-upload'),
 
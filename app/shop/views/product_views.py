@@ -1,4 +1,5 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from django.conf import settings
 from django.utils import timezone
 import json
 from html import unescape
@@ -14,11 +15,10 @@ from django.core.files.uploadedfile import InMemoryUploadedFile
 
 from itertools import product
 from django.db.models import Sum
-from django.http import HttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
 
-from django.db.models.functions import TruncDate
 from django.shortcuts import get_object_or_404
-from django.contrib.postgres.search import SearchVector
 from django.db.models import Count, Q
 from core.permissions import (IsAuctionOwner)
 from rest_framework import (authentication, mixins, generics, serializers, status,
@@ -31,24 +31,40 @@ from rest_framework.exceptions import NotFound
 
 
 from core import permissions
-from core.utils import (StandardResultsSetPagination, clean_url,
-                        create_error_data, create_message_data)
-from shop.models import (Category, Media, Product,ProductImages, ProductMedia, Bid, ProductAttribute, UserStats,
-                         ProductAttributeValues)
-from shop.serializers import (CategorySerializer,
+from core.metrics import metrics
+from core.utils import (KeysetPagination, StandardResultsSetPagination,
+                        clean_url, create_error_data, create_message_data)
+from shop.models import (AuctionBidStats, AuctionDailyStats, Bid, Category,
+                         Media, Product, ProductAttribute,
+                         ProductAttributeValue, ProductAttributeValues,
+                         ProductImages, ProductMedia, ProxyBid, UserStats)
+from shop.serializers import (AuctionBidStatsSerializer,
+                              CategorySerializer,
                               ProductAttributeNoCategorySerializer,
                               ProductAttributeSerializer,
-                              BidSerializer,                              
+                              BidSerializer,
+                              PlaceBidSerializer,
+                              ProxyBidSerializer,
                               UserStatsSerializer,
                               FileUploadSerializer,
-                              BidChartSerializer,
+                              ChartQuerySerializer,
+                              HistoryExportQuerySerializer,
                               ImageSerializer,
-                              ViewChartSerializer,
+                              PriceHistoryQuerySerializer,
                               ProductMediaSerializer,
                               ProductAttributeValuesAttrSerializer,
                               ProductAttributeValuesSerializer,
                               ProductDetailSerializer, ProductImageSerializer,
                               ProductSerializer)
+from shop.services import (EXPORT_CONTENT_TYPES, EXPORT_KINDS, VIEW_EXISTS,
+                           VIEW_STORED, VIEW_UNKNOWN_AUCTION, BidRejected,
+                           DuplicateBid, ExportUnavailable, PlacedBid,
+                           bid_responses, cached_analytics, chart_series,
+                           compute_bid_stats, estimate_unique_viewers,
+                           export_history, get_bid_engine, get_product_index,
+                           get_search_backend, get_view_buffer, price_history,
+                           resolve_proxy_bids,
+                           seller_bid_stats, seller_dashboard, store_views)
 
 
 class ShopCategoryViewSet(
@@ -92,6 +108,30 @@ class ProductAttributesViewSet(
             return Response(str(e), status=status.HTTP_400_BAD_REQUEST)
 
 
+def group_facets(rows):
+    """
+    Attribute facets from (attribute id, attribute name, value id, value
+    name, product count) rows ordered by attribute
+    """
+    attributes = {}
+    for row in rows:
+        attribute_id, attribute_name, value_id, value_name, product_count = row
+        if attribute_id not in attributes:
+            attributes[attribute_id] = {
+                "id": attribute_id,
+                "name": attribute_name,
+                "values": [],
+            }
+        attributes[attribute_id]["values"].append(
+            {
+                "id": value_id,
+                "name": value_name,
+                "product_count": product_count,
+            }
+        )
+    return list(attributes.values())
+
+
 class PublicProductViewSet(
     viewsets.GenericViewSet,
     mixins.RetrieveModelMixin,
@@ -179,14 +219,16 @@ class PublicProductViewSet(
         if int(most_appreciated) == 1:
             queryset = queryset.annotate(q_count=Count("likes")).order_by("-q_count")
         if keywords:
-            queryset = queryset.annotate(
-                search=SearchVector("name", "description"),
-            ).filter(search=keywords)
+            queryset = get_search_backend().search(queryset, keywords)
 
         if country:
             queryset = queryset.filter(user__professionaluser__country=country)
 
-        return queryset.distinct()
+        queryset = queryset.distinct()
+        if self.action in ("list", "product_search", "retrieve"):
+            serializer_class = self.get_serializer_class()
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
 
     def validate_request_data(self, request):
         request_data = request.data.copy()
@@ -321,59 +363,88 @@ class PublicProductViewSet(
         self.save_data(serializer=serializer, validated_data=validated_data)
 
     def get_attributes(self, queryset):
-        # Get related attributes
-        p_a_v = "productattributevaluess__attributevalues__attribute_value"
-        p_a_id = "productattributevaluess__attributevalues__id"
-        p_a_p_id = "productattributevaluess__attributevalues__product_attribute__id"
-        p_a_p_n = "productattributevaluess__attributevalues__product_attribute__name"
-        queryset2 = queryset.filter(
-            productattributevaluess__attributevalues__isnull=False
-        ).values(
-            "id",
-            "name",
-            p_a_p_id,
-            p_a_p_n,
-            p_a_id,
-            p_a_v,
+        """
+        Attribute facets of the filtered products: every attribute with its
+        values and how many of the products have each value, counted in one
+        grouped query.
+        """
+        rows = (
+            ProductAttributeValues.objects.filter(
+                product__in=queryset.order_by().values("id")
+            )
+            .values_list(
+                "attributevalues__product_attribute_id",
+                "attributevalues__product_attribute__name",
+                "attributevalues_id",
+                "attributevalues__attribute_value",
+            )
+            .annotate(product_count=Count("product", distinct=True))
+            .order_by(
+                "attributevalues__product_attribute_id", "attributevalues_id"
+            )
+        )
+        return group_facets(rows)
+
+    # Search filters the product index cannot answer
+    UNINDEXED_FILTERS = ("featured", "appreciated", "keywords", "country")
+
+    def indexed_search(self, index, filterData):
+        """product_search answered from the product index"""
+        category = int(filterData.get("category") or 0)
+        categories = None
+        if category > 0:
+            categories = list(
+                Category.objects.get(id=category)
+                .get_descendants(include_self=True)
+                .values_list("id", flat=True)
+            )
+        user_id = int(filterData.get("user_id") or 0)
+        matches = index.search(
+            categories=categories,
+            seller=user_id if user_id > 0 else None,
+            region=filterData.get("region") or None,
+            city=filterData.get("city") or None,
+            selected=[
+                item["selected"] for item in filterData.get("filters") or []
+            ],
         )
 
-        attributes = []
-        for attribute in queryset2:
-            attribute_exits = any(x["id"] == attribute[p_a_p_id] for x in attributes)
-
-            if attribute_exits:
-                for val in attributes:
-                    if val["id"] == attribute[p_a_p_id]:
-                        attribute_exits = any(
-                            x["id"] == attribute[p_a_id] for x in val["values"]
-                        )
-                        if attribute_exits:
-                            continue
-                        else:
-                            value_data = {}
-                            value_data["id"] = attribute[p_a_id]
-                            value_data["name"] = attribute[p_a_v]
-                            value_data["product_count"] = sum(
-                                p[p_a_v] == value_data["name"] for p in queryset2
-                            )
-
-                            val["values"].append(value_data)
-                        # break
-            else:
-                data = {}
-                data["id"] = attribute[p_a_p_id]
-                data["name"] = attribute[p_a_p_n]
-                data["values"] = []
-                value_data = {}
-                value_data["id"] = attribute[p_a_id]
-                value_data["name"] = attribute[p_a_v]
-                value_data["product_count"] = sum(
-                    p[p_a_v] == value_data["name"] for p in queryset2
-                )
-
-                data["values"].append(value_data)
-                attributes.append(data)
-        return attributes
+        counts = index.value_counts(matches)
+        values = (
+            ProductAttributeValue.objects.filter(id__in=counts)
+            .order_by("product_attribute_id", "id")
+            .values_list(
+                "product_attribute_id",
+                "product_attribute__name",
+                "id",
+                "attribute_value",
+            )
+        )
+        attributes = group_facets(row + (counts[row[2]],) for row in values)
+
+        recent = int(filterData.get("recent") or 0) == 1
+        ids = index.ordered_ids(matches, recent=recent)
+        page = self.paginate_queryset(ids)
+        page_ids = ids if page is None else page
+        products = self.get_serializer_class().setup_eager_loading(
+            self.queryset.filter(id__in=page_ids)
+        ).in_bulk()
+        # Products changed since the index last saw them may be gone
+        serializer = self.get_serializer(
+            [
+                products[product_id]
+                for product_id in page_ids
+                if product_id in products
+            ],
+            many=True,
+        )
+        if page is None:
+            return Response(
+                {"attributes": attributes, "items": serializer.data}
+            )
+        response = self.get_paginated_response(serializer.data)
+        response.data["attributes"] = attributes
+        return Response(data=response.data, status=status.HTTP_200_OK)
 
     @action(
         methods=["POST"],
@@ -383,8 +454,14 @@ class PublicProductViewSet(
     )
     def product_search(self, request, *args, **kwargs):
         """Get products with applied filters, search & others"""
-        queryset = self.filter_queryset(self.get_queryset())
         filterData = request.data
+        index = get_product_index()
+        if index is not None and not any(
+            filterData.get(name) for name in self.UNINDEXED_FILTERS
+        ):
+            return self.indexed_search(index, filterData)
+
+        queryset = self.filter_queryset(self.get_queryset())
         appliedFilters = filterData.get("filters") or []
 
         for item in appliedFilters:
@@ -461,56 +538,28 @@ class PublicProductViewSet(
         serializer = self.get_serializer(instance)
 
         dataSet = serializer.data
-        attributes_unsorted = dataSet["attribute_values"]
 
-        dataSet["attributes"] = []
-        for attribute in attributes_unsorted:
-            attribute_exits = any(
-                x["name"] == attribute["product_attribute"]
-                for x in dataSet["attributes"]
+        # Group the prefetched values by attribute name, in first seen order
+        attributes = {}
+        for value in instance.attribute_values.all():
+            attribute = value.product_attribute
+            group = attributes.setdefault(
+                attribute.name,
+                {
+                    "name": attribute.name,
+                    "is_color": False,
+                    "is_size": False,
+                    "values": {},
+                },
             )
-
-            if attribute_exits:
-                for val in dataSet["attributes"]:
-                    if val["name"] == attribute["product_attribute"]:
-                        attribute_exits = any(
-                            x["id"] == attribute["id"] for x in val["values"]
-                        )
-                        if attribute_exits:
-                            continue
-                        else:
-                            value_data = {}
-                            value_data["id"] = attribute["id"]
-                            value_data["name"] = attribute["attribute_value"]
-                            val["values"].append(value_data)
-
-            else:
-                atrribute_single = {}
-                atrribute_single["name"] = attribute["product_attribute"]
-                try:
-                    product_attr_data = ProductAttribute.objects.get(
-                        name=attribute["product_attribute"], is_color=True
-                    )
-                    if product_attr_data:
-                        atrribute_single["is_color"] = True
-                except ProductAttribute.DoesNotExist:
-                    atrribute_single["is_color"] = False
-                try:
-                    product_attr_data = ProductAttribute.objects.get(
-                        name=attribute["product_attribute"], is_size=True
-                    )
-                    if product_attr_data:
-                        atrribute_single["is_size"] = True
-                except ProductAttribute.DoesNotExist:
-                    atrribute_single["is_size"] = False
-                atrribute_single["values"] = []
-
-                value_data = {}
-                value_data["id"] = attribute["id"]
-                value_data["name"] = attribute["attribute_value"]
-                atrribute_single["values"].append(value_data)
-
-                dataSet["attributes"].append(atrribute_single)
+            group["is_color"] |= attribute.is_color
+            group["is_size"] |= attribute.is_size
+            group["values"].setdefault(
+                value.id, {"id": value.id, "name": value.attribute_value}
+            )
+        for group in attributes.values():
+            group["values"] = list(group["values"].values())
+        dataSet["attributes"] = list(attributes.values())
 
         dataSet.pop("attribute_values", None)
         return Response(dataSet)
@@ -554,47 +603,137 @@ class CreateBidView(generics.ListCreateAPIView):
 
 
     def create(self, request, *args, **kwargs):
-        auction_id = request.data.get('auction')
-        bid_amount = int(request.data.get('bid_amount'))
-        auction = Product.objects.get(pk=auction_id)
-        current_time = timezone.now()
-        auction_start_time = auction.start_time
-        auction_end_time = auction.end_time
-
-        if auction_start_time < current_time and auction_end_time > current_time and auction_start_time < auction_end_time:
-            try:
-                auction = Product.objects.get(pk=auction_id)
-            except Product.DoesNotExist:
-                return Response({"detail": "Auction not found."}, status=status.HTTP_404_NOT_FOUND)
+        idempotency_key = request.headers.get("Idempotency-Key")
+        if idempotency_key is None:
+            return self.submit_bid(request)
+
+        max_length = Bid._meta.get_field("idempotency_key").max_length
+        if not 0 < len(idempotency_key) <= max_length:
+            return Response(
+                {
+                    "detail": "Idempotency-Key must be 1 to 64 characters "
+                    "long."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            if auction.current_highest_bid is None or auction.current_highest_bid == 0 or bid_amount > (auction.current_highest_bid + auction.bidding_step):
-                auction.current_highest_bid = bid_amount
-            else:
-                return Response({"detail": "Bid amount must be greater than the current highest bid amount"}, status=status.HTTP_400_BAD_REQUEST)
+        # Retries get the stored response before any database work
+        cache_key = (request.user.id, idempotency_key)
+        stored = bid_responses.get(cache_key)
+        if stored is not None:
+            return Response(
+                stored.data,
+                status=stored.status_code,
+                headers={"Idempotent-Replayed": "true"},
+            )
 
-            # Create a Bid object but do not save it yet
-            bid = Bid(auction=auction, bidder=request.user, bid_amount=bid_amount)
+        response = self.submit_bid(request, idempotency_key)
+        bid_responses.put(cache_key, response.status_code, response.data)
+        return response
 
-            if self.perform_create(bid):
-                return Response({"detail": "Bid placed successfully."}, status=status.HTTP_201_CREATED)
-            else:
-                return Response({"detail": "Failed to place bid."}, status=status.HTTP_400_BAD_REQUEST)
+    def submit_bid(self, request, idempotency_key=None):
+        bid = PlaceBidSerializer(data=request.data)
+        bid.is_valid(raise_exception=True)
+        auction_id = bid.validated_data['auction']
+        bid_amount = bid.validated_data['bid_amount']
 
-        else:
-                return Response({"detail": "Bid can only be placed within the specified time frame."}, status=status.HTTP_400_BAD_REQUEST)
-        
- 
-    def perform_create(self, bid):
- 
         try:
-            bid.save()
-            bid.auction.save()
-            return True
-        except Exception:
-            return False
-        
+            placed = get_bid_engine().place_bid(
+                auction_id, request.user, bid_amount, idempotency_key
+            )
+        except BidRejected as e:
+            return Response({"detail": e.detail}, status=e.status_code)
+        except DuplicateBid as e:
+            # The original request was stored but its response never reached
+            # the client
+            metrics.incr("bid_idempotency.db_duplicates")
+            end_time = None
+            if settings.AUCTION_SOFT_CLOSE_WINDOW:
+                end_time = Product.objects.values_list(
+                    "end_time", flat=True
+                ).get(pk=e.bid.auction_id)
+            placed = PlacedBid(e.bid, end_time, False)
+        else:
+            # Outbid proxies answer right away instead of waiting for owners
+            resolve_proxy_bids(auction_id)
+
+        return Response(
+            {
+                "detail": "Bid placed successfully.",
+                "end_time": serializers.DateTimeField().to_representation(
+                    placed.end_time
+                ),
+                "extended": placed.extended,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class CreateProxyBidView(generics.CreateAPIView):
+    queryset = ProxyBid.objects.all()
+    serializer_class = ProxyBidSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        auction = serializer.validated_data["auction"]
+
+        proxy, _ = ProxyBid.objects.update_or_create(
+            auction=auction,
+            bidder=request.user,
+            defaults={
+                "max_amount": serializer.validated_data["max_amount"],
+                "is_active": True,
+            },
+        )
+        resolve_proxy_bids(auction.id)
+        return Response(
+            self.get_serializer(proxy).data, status=status.HTTP_201_CREATED
+        )
+
+
+class BidHistoryPagination(KeysetPagination):
+    ordering = ("-bid_time", "-id")
+
+
+class BidHistoryMixin:
+    """Keyset pagination and streamed NDJSON export for bid history lists"""
 
-class AuctionBidListView(generics.ListAPIView):
+    pagination_class = BidHistoryPagination
+    export_fields = (
+        ("id", "id"),
+        ("auction", "auction_id"),
+        ("is_active", "is_active"),
+        ("bid_amount", "bid_amount"),
+        ("bid_time", "bid_time"),
+    )
+    export_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("export") == "ndjson":
+            queryset = self.filter_queryset(self.get_queryset())
+            return self.export_ndjson(queryset)
+        return super().list(request, *args, **kwargs)
+
+    def export_ndjson(self, queryset):
+        keys = [key for key, _ in self.export_fields]
+        rows = (
+            queryset.order_by(*self.pagination_class.ordering)
+            .values_list(*[column for _, column in self.export_fields])
+            .iterator(chunk_size=self.export_chunk_size)
+        )
+        lines = (
+            json.dumps(dict(zip(keys, row)), cls=DjangoJSONEncoder) + "\n"
+            for row in rows
+        )
+        return StreamingHttpResponse(
+            lines, content_type="application/x-ndjson"
+        )
+
+
+class AuctionBidListView(BidHistoryMixin, generics.ListAPIView):
     queryset = Bid.objects.all()
     serializer_class = BidSerializer
     permission_classes = [IsAuthenticated]
@@ -606,7 +745,61 @@ class AuctionBidListView(generics.ListAPIView):
         return Bid.objects.filter(auction__id=self.kwargs['auction_id'])
 
 
-class BidListView(generics.ListAPIView):
+class PriceHistoryView(generics.GenericAPIView):
+    """
+    Price curve of an auction as [time, amount] points, downsampled with
+    Largest-Triangle-Three-Buckets to at most ?points= points (500 by
+    default) so charts keep their shape without the full bid list.
+    """
+    serializer_class = PriceHistoryQuerySerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def get(self, request, auction_id, *args, **kwargs):
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        history = price_history(auction_id, query.validated_data['points'])
+        if history is None:
+            raise NotFound()
+        return Response(history, status=status.HTTP_200_OK)
+
+
+class AuctionBidStatsView(generics.RetrieveAPIView):
+    """
+    Bidding activity of an auction as last materialized by the
+    materialize_bid_stats command, computed on the fly until then.
+    """
+    queryset = AuctionBidStats.objects.all()
+    serializer_class = AuctionBidStatsSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    lookup_field = 'auction_id'
+
+    def get_object(self):
+        auction_id = self.kwargs['auction_id']
+        stats = self.get_queryset().filter(auction_id=auction_id).first()
+        if stats is None:
+            stats = next(iter(compute_bid_stats([auction_id])), None)
+        if stats is None:
+            raise NotFound()
+        return stats
+
+
+class SellerBidStatsView(generics.GenericAPIView):
+    """Materialized bidding activity of the seller's auctions, hottest first"""
+    serializer_class = AuctionBidStatsSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def get(self, request, *args, **kwargs):
+        summary = seller_bid_stats(request.user.id)
+        summary['hottest'] = self.get_serializer(
+            summary['hottest'], many=True
+        ).data
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+class BidListView(BidHistoryMixin, generics.ListAPIView):
     queryset = Bid.objects.all()
     serializer_class = BidSerializer
     permission_classes = [IsAuthenticated]
@@ -641,18 +834,108 @@ class RecordView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
 
-    def perform_create(self, serializer):
-        user = self.request.user
-        auction_id = self.request.data.get('auction')
-        auction = get_object_or_404(Product, id=auction_id)
+    def create(self, request, *args, **kwargs):
+        try:
+            auction_id = int(request.data.get('auction'))
+        except (TypeError, ValueError):
+            return Response(
+                {"detail": "A valid auction is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Stored in the background, repeated views of an auction coalesce
+        get_view_buffer().record(request.user.id, auction_id)
+        return Response(
+            {"detail": "View recorded."}, status=status.HTTP_202_ACCEPTED
+        )
+
 
-        # Check if a view already exists for this user and auction within the last 24 hours
-        one_day_ago = timezone.now() - timedelta(days=1)
-        existing_view = UserStats.objects.filter(user=user, auction=auction).first()
+class RecordViewBatch(generics.GenericAPIView):
+    """
+    Record many auction views in one request.
 
-        if not existing_view:
-            # Record a new view
-            serializer.save(user=user, auction=auction)
+    Takes {"views": [{"auction": id, "viewed_at": iso datetime}, ...]},
+    viewed_at being optional, and answers {"results": [...]} with one code
+    per item: 201 stored, 200 already recorded, 404 unknown auction and
+    400 invalid item.
+    """
+    queryset = UserStats.objects.all()
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    max_views = 500
+
+    def post(self, request, *args, **kwargs):
+        items = None
+        if isinstance(request.data, dict):
+            items = request.data.get('views')
+        if not isinstance(items, list) or not 0 < len(items) <= self.max_views:
+            return Response(
+                {"detail": f"Send 1 to {self.max_views} views."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        now = timezone.now()
+        timestamp_field = serializers.DateTimeField()
+        keys = []
+        views = {}
+        for item in items:
+            try:
+                auction_id = int(item['auction'])
+                viewed_at = item.get('viewed_at')
+                # Client clocks may run ahead, a view never happens later
+                # than now
+                if viewed_at:
+                    viewed_at = min(
+                        timestamp_field.to_internal_value(viewed_at), now
+                    )
+                else:
+                    viewed_at = now
+            except (
+                KeyError,
+                TypeError,
+                ValueError,
+                AttributeError,
+                serializers.ValidationError,
+            ):
+                keys.append(None)
+                continue
+            key = (request.user.id, auction_id)
+            keys.append(key)
+            views.setdefault(key, viewed_at)
+
+        outcomes = store_views(views) if views else {}
+        codes = {VIEW_STORED: 201, VIEW_EXISTS: 200, VIEW_UNKNOWN_AUCTION: 404}
+        results = []
+        for key in keys:
+            if key is None:
+                results.append(400)
+                continue
+            results.append(codes[outcomes[key]])
+            # Repeats of an auction in the batch were recorded by the first
+            if outcomes[key] == VIEW_STORED:
+                outcomes[key] = VIEW_EXISTS
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+# Seller dashboard periods, counted in whole days of the daily rollups
+TIME_FRAMES = {
+    '1week': timedelta(weeks=1),
+    '1month': timedelta(days=30),
+    '6months': timedelta(days=180),
+}
+
+
+def seller_rollups(user, time_frame):
+    """Daily rollups of the seller's auctions within a dashboard time frame"""
+    if time_frame not in TIME_FRAMES:
+        return AuctionDailyStats.objects.none()
+    first_day = timezone.localdate() - TIME_FRAMES[time_frame]
+    return AuctionDailyStats.objects.filter(seller=user, day__gte=first_day)
+
+
+def seller_rollups_params(request):
+    """Cache key params of a time frame answer, which moves with the day"""
+    return (request.data.get('time_frame'), timezone.localdate())
 
 
 class GetAllViewRecords(generics.ListAPIView):
@@ -661,27 +944,25 @@ class GetAllViewRecords(generics.ListAPIView):
     authentication_classes = [TokenAuthentication]
 
     def get_queryset(self):
-        user = self.request.user
-        time_frame = self.request.data.get('time_frame')
-        if time_frame == '1week':
-            one_week_ago = timezone.now() - timedelta(weeks=1)
-            queryset = UserStats.objects.filter(auction__user=user, view_timestamp__gte=one_week_ago)
-            return queryset
-        elif time_frame == '1month':
-            one_month_ago = timezone.now() - timedelta(days=30)
-            queryset = UserStats.objects.filter(auction__user=user, view_timestamp__gte=one_month_ago)
-            return queryset
-        elif time_frame == '6months':
-            six_months_ago = timezone.now() - timedelta(days=180)
-            queryset = UserStats.objects.filter(auction__user=user, view_timestamp__gte=six_months_ago)
-            return queryset
-        else:
-            return UserStats.objects.none()
-        
+        return seller_rollups(
+            self.request.user, self.request.data.get('time_frame')
+        )
+
     def list(self, request, *args, **kwargs):
+        return Response(cached_analytics(
+            'view_records',
+            request.user.id,
+            seller_rollups_params(request),
+            self.count_views,
+        ), status=status.HTTP_200_OK)
+
+    def count_views(self):
         queryset = self.filter_queryset(self.get_queryset())
-        bid_count = queryset.count()
-        return Response({'total_views': bid_count}, status=status.HTTP_200_OK)
+        view_count = queryset.aggregate(total=Sum('view_count'))['total']
+        return {
+            'total_views': view_count or 0,
+            'unique_viewers': estimate_unique_viewers(queryset),
+        }
 
 
 class GetUserTotalBids(generics.ListAPIView):
@@ -690,57 +971,146 @@ class GetUserTotalBids(generics.ListAPIView):
     authentication_classes = [TokenAuthentication]
 
     def get_queryset(self):
-        user = self.request.user
-        time_frame = self.request.data.get('time_frame')
-
-        if time_frame == '1week':
-            one_week_ago = timezone.now() - timedelta(weeks=1)
-            return Bid.objects.filter(auction__user=user, bid_time__gte=one_week_ago)
-        elif time_frame == '1month':
-            one_month_ago = timezone.now() - timedelta(days=30)
-            return Bid.objects.filter(auction__user=user, bid_time__gte=one_month_ago)
-        elif time_frame == '6months':
-            six_months_ago = timezone.now() - timedelta(days=180)
-            return Bid.objects.filter(auction__user=user, bid_time__gte=six_months_ago)
-        else:
-            return Bid.objects.none()
+        return seller_rollups(
+            self.request.user, self.request.data.get('time_frame')
+        )
 
     def list(self, request, *args, **kwargs):
+        return Response(cached_analytics(
+            'total_bids',
+            request.user.id,
+            seller_rollups_params(request),
+            self.count_bids,
+        ), status=status.HTTP_200_OK)
+
+    def count_bids(self):
+        if self.request.data.get('time_frame') == 'all':
+            # Counted on every accepted bid, no need to scan the bids
+            total = Product.objects.filter(
+                user=self.request.user
+            ).aggregate(total=Sum('bid_count'))['total']
+            return {'total_bids': total or 0}
+
         queryset = self.filter_queryset(self.get_queryset())
-        bid_count = queryset.count()
-        return Response({'total_bids': bid_count}, status=status.HTTP_200_OK)
+        bid_count = queryset.aggregate(total=Sum('bid_count'))['total']
+        return {'total_bids': bid_count or 0}
+
 
+class ChartSeriesView(generics.GenericAPIView):
+    """
+    Dense series of the seller's bids or views.
 
-class BidChartView(generics.ListAPIView):
-    serializer_class = BidChartSerializer
+    Takes ?start= and ?end= (ISO dates, both included) and ?granularity=
+    hour, day, week or month, and returns every bucket of the range with
+    its count, zero when nothing happened.
+    """
+    serializer_class = ChartQuerySerializer
     permission_classes = [IsAuthenticated, permissions.IsAuctionOwner]
     authentication_classes = [TokenAuthentication]
+    metric = None
+
+    def get(self, request, *args, **kwargs):
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        series = cached_analytics(
+            f'{self.metric}_chart', request.user.id,
+            (params['start'], params['end'], params['granularity']),
+            lambda: chart_series(request.user.id, self.metric, **params),
+        )
+        return Response(series, status=status.HTTP_200_OK)
 
-    def get_queryset(self):
-        user = self.request.user
-        bid_data = (
-            Bid.objects
-            .filter(auction__user=user)
-            .values('bid_time__date')
-            .annotate(bid_count=Count('id'))
-            # .order_by('bid_time__date')
+
+class BidChartView(ChartSeriesView):
+    metric = 'bids'
+
+
+class ViewChartView(ChartSeriesView):
+    metric = 'views'
+
+
+class SellerDashboardView(generics.GenericAPIView):
+    """
+    Bid and view totals of the seller's auctions with their per-day series.
+
+    Covers ?start= to ?end= (ISO dates, both included), the last 30 days by
+    default. Served from the daily rollups and cached until the next bid or
+    view on one of the seller's auctions.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    default_days = 30
+
+    def get(self, request, *args, **kwargs):
+        try:
+            end = request.query_params.get('end')
+            end = date.fromisoformat(end) if end else timezone.localdate()
+            start = request.query_params.get('start')
+            if start:
+                start = date.fromisoformat(start)
+            else:
+                start = end - timedelta(days=self.default_days - 1)
+        except ValueError:
+            return Response(
+                {"detail": "start and end must be dates as YYYY-MM-DD."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if start > end:
+            return Response(
+                {"detail": "start must not be after end."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if (end - start).days >= settings.DASHBOARD_MAX_DAYS:
+            return Response(
+                {
+                    "detail": "The range spans at most "
+                    f"{settings.DASHBOARD_MAX_DAYS} days."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            seller_dashboard(request.user.id, start, end),
+            status=status.HTTP_200_OK,
         )
 
-        return bid_data
-    
 
-class ViewChartView(generics.ListAPIView):
-    serializer_class = ViewChartSerializer
-    permission_classes = [IsAuthenticated, permissions.IsAuctionOwner]
+class SellerHistoryExportView(generics.GenericAPIView):
+    """
+    Stream the raw bids or views of the seller's auctions as a file.
+
+    Takes ?start= and ?end= (ISO dates, both included) and ?file_format=
+    csv or parquet, the latter only when pyarrow is installed. Rows are
+    read in chunks and streamed, so memory stays flat however long the
+    history is.
+    """
+    serializer_class = HistoryExportQuerySerializer
+    permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
 
+    def get(self, request, kind, *args, **kwargs):
+        if kind not in EXPORT_KINDS:
+            raise NotFound()
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        file_format = query.validated_data['file_format']
+        try:
+            chunks = export_history(
+                request.user.id, kind, **query.validated_data
+            )
+        except ExportUnavailable as error:
+            return Response(
+                {"detail": str(error)}, status=status.HTTP_406_NOT_ACCEPTABLE
+            )
+
+        response = StreamingHttpResponse(
+            chunks, content_type=EXPORT_CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{kind}.{file_format}"'
+        )
+        return response
 
-    def get_queryset(self):
-        # Retrieve view data with counts for each date
-        user = self.request.user
-        view_data = UserStats.objects.filter(auction__user=user).annotate(view_date=TruncDate('view_timestamp')).values('view_date').annotate(view_count=Count('id'))
-        return view_data
-    
 
 def resize_image(uploaded_file, width, height):
     img = Image.open(uploaded_file)
@@ -14,6 +14,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from core import permissions
+from core.metrics import metrics
 from core.utils import (StandardResultsSetPagination, clean_url,
                         create_error_data, create_message_data)
 from shop.models import Category
@@ -58,3 +59,11 @@ class ShopCategoryViewSetAdmin(
     queryset = Category.objects.filter(level=0)
     authentication_classes = (TokenAuthentication,)
     permission_classes = (permissions.allowOnlyAuthenticatedAdmins,)
+
+
+@api_view(["GET"])
+@authentication_classes([TokenAuthentication])
+@permission_classes([permissions.allowOnlyAuthenticatedAdmins])
+def get_metrics(request):
+    """Get the counters of this worker process"""
+    return Response(data=metrics.snapshot(), status=status.HTTP_200_OK)